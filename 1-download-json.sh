@@ -9,6 +9,19 @@ cd "$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/"
 
 source .env
 
+# Incremental mode: download only the PRs changed since the last run
+if [ "$SYNC_MODE" == "incremental" ]; then
+    python -c "from fetch import download_json_incremental; download_json_incremental()"
+    exit 0
+fi
+
+# Async mode: same as incremental, calling GitHub GraphQL API directly
+if [ "$SYNC_MODE" == "async" ]; then
+    export GITHUB_TOKEN
+    python -c "from fetch_async import download_json_async; download_json_async()"
+    exit 0
+fi
+
 cd repo
 
 gh pr list --state all --limit 2500 \
@@ -6,3 +6,9 @@ set -e
 cd "$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/"
 
 python -c "from lib import update_csv; update_csv()"
+
+# PR timelines, only if TIMELINE_FILE is set in config.py
+python -c "from timeline import update_timelines; update_timelines()"
+
+# Stats by label, author and branch, only if CUBE_FILE is set in config.py
+python -c "from cube import update_cube; update_cube()"
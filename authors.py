@@ -0,0 +1,99 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+# Classification of PR authors: team members, former team members, bots, external contributors.
+#
+# The index is built once per run from TEAM_MEMBERS, plus two optional files:
+#
+# AUTHORS_FILE, JSON, e.g.
+#   {
+#     "team": ["dluc"],
+#     "bots": ["my-ci-bot"],
+#     "former": {"alice": [["2021-01-01T00:00:00Z", "2023-06-30T00:00:00Z"]]}
+#   }
+#   Former members are considered team members for PRs created within the given date ranges.
+#
+# ORG_MEMBERS_FILE, GitHub organization members, considered team members, exported with
+#   python -c "from authors import export_org_members; export_org_members('<org>')"
+#   The file contains one login per line, a JSON list of logins, or a JSON list of users.
+
+import json, os, subprocess
+from dateutil.parser import parse
+
+TEAM = "team"
+FORMER = "former"
+BOT = "bot"
+EXTERNAL = "external"
+
+# Categories, stored as small integers in the PR table (index in this list)
+CATEGORIES = [TEAM, FORMER, BOT, EXTERNAL]
+
+
+# Categories counted as external PRs in the reports. Bots are external, as they were before
+# the author categories, unless BOTS_EXTERNAL is False in config.py
+def external_categories(bots_external=True):
+    return [FORMER, BOT, EXTERNAL] if bots_external else [FORMER, EXTERNAL]
+
+
+# Check if a login belongs to a bot, e.g. "dependabot[bot]", "app/renovate"
+def is_bot_login(login):
+    return login.endswith("[bot]") or login.startswith("app/")
+
+
+class AuthorIndex:
+    def __init__(self):
+        # Category of each login, logins not listed are bots or external contributors
+        self.categories = dict()
+        # Membership date ranges of former team members, as epoch seconds
+        self.membership = dict()
+
+    # Get the author category of a PR created at the given date (epoch seconds)
+    def category(self, login, created_at):
+        category = self.categories.get(login)
+        if category is None:
+            return BOT if is_bot_login(login) else EXTERNAL
+        if category == FORMER:
+            for begin, end in self.membership[login]:
+                if begin <= created_at <= end:
+                    return TEAM
+        return category
+
+
+# Read GitHub organization members, saved by export_org_members() or by `gh api orgs/<org>/members`
+def read_org_members(file_name):
+    with open(file_name, "r") as input_file:
+        content = input_file.read().strip()
+    if not content.startswith("["):
+        return [line.strip() for line in content.splitlines() if line.strip()]
+    return [m if isinstance(m, str) else m["login"] for m in json.loads(content)]
+
+
+# Build the author index, see the comments at the top of the file
+def load_author_index(team_members, authors_file="", org_members_file=""):
+    index = AuthorIndex()
+
+    if org_members_file and os.path.isfile(org_members_file):
+        for login in read_org_members(org_members_file):
+            index.categories[login] = TEAM
+
+    for login in team_members:
+        index.categories[login] = TEAM
+
+    if authors_file and os.path.isfile(authors_file):
+        with open(authors_file, "r") as input_file:
+            authors = json.load(input_file)
+        for login in authors.get("team", []):
+            index.categories[login] = TEAM
+        for login in authors.get("bots", []):
+            index.categories[login] = BOT
+        for login, ranges in authors.get("former", dict()).items():
+            index.categories[login] = FORMER
+            index.membership[login] = [(int(parse(b).timestamp()), int(parse(e).timestamp())) for b, e in ranges]
+
+    return index
+
+
+# Save the members of a GitHub organization in ORG_MEMBERS_FILE, one login per line
+def export_org_members(org, file_name="org-members.txt"):
+    cmd = ["gh", "api", f"orgs/{org}/members", "--paginate", "--jq", ".[].login"]
+    with open(file_name, "w") as output_file:
+        subprocess.run(cmd, check=True, stdout=output_file)
@@ -0,0 +1,205 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+# Benchmarks, run with: python bench.py --help
+#
+# Examples:
+#   python bench.py --sizes 1000,10000,100000       run the pipeline with synthetic data
+#   python bench.py --sizes 10000 --save-baseline   save the results as the baseline
+#   python bench.py --dates                         compare dateutil and to_epoch()
+
+import lib
+from lib import to_epoch
+from dateutil.parser import parse
+import argparse, contextlib, json, os, platform, random, sys, tempfile, time, tracemalloc
+
+RESULTS_FILE = "bench-results.json"
+BASELINE_FILE = "bench-baseline.json"
+
+
+# Compare dateutil and to_epoch(), parsing the same GitHub dates
+def bench_dates(count=100000):
+    random.seed(0)
+    start = 1577836800  # 2020-01-01
+    dates = [
+        time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(start + random.randint(0, 86400 * 365 * 4)))
+        for i in range(count)
+    ]
+
+    begin = time.perf_counter()
+    for date in dates:
+        int(parse(date).timestamp())
+    dateutil_time = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    for date in dates:
+        to_epoch(date)
+    to_epoch_time = time.perf_counter() - begin
+
+    print(f"Parsing {count} dates")
+    print(f"dateutil.parse: {dateutil_time:.3f} secs")
+    print(f"to_epoch:       {to_epoch_time:.3f} secs ({dateutil_time / to_epoch_time:.1f}x faster)")
+
+
+# Generate `count` random PRs, in the format downloaded by `gh pr list`.
+# PRs are created at a steady rate (about 10 per day), ending now. Most PRs
+# are merged within a few days, some stay open for months.
+def gen_synthetic_prs(count, seed=0):
+    rnd = random.Random(seed)
+    now = int(time.time())
+    span = max(120, count // 10) * 86400
+    team = list(lib.TEAM_MEMBERS) or ["dluc"]
+    externals = [f"contributor{i}" for i in range(max(10, count // 20))]
+    bots = ["dependabot[bot]", "app/github-actions"]
+    labels = ["bug", "documentation", "enhancement", "python", ".net", "java", "samples", "memory"]
+
+    def iso(ts):
+        return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts))
+
+    prs = []
+    for number in range(1, count + 1):
+        created = now - span + (span * number) // count - rnd.randint(0, 3600)
+
+        # Authors: 45% team, 50% external (few very active contributors), 5% bots
+        r = rnd.random()
+        if r < 0.45:
+            author = rnd.choice(team)
+        elif r < 0.95:
+            author = externals[min(int(rnd.paretovariate(1.2)) - 1, len(externals) - 1)]
+        else:
+            author = rnd.choice(bots)
+
+        # Time to close: usually days, sometimes months
+        ended = created + int(rnd.lognormvariate(11.5, 1.5))
+        r = rnd.random()
+        if ended >= now or r < 0.05:
+            state, ended = "OPEN", None
+        elif r < 0.85:
+            state = "MERGED"
+        else:
+            state = "CLOSED"
+
+        updated = ended if ended else min(now, created + rnd.randint(0, 86400 * 10))
+        prs.append(
+            {
+                "number": number,
+                "state": state,
+                "closed": state != "OPEN",
+                "isDraft": state == "OPEN" and rnd.random() < 0.15,
+                "title": f"Synthetic PR {number}, {rnd.choice(labels)} changes",
+                "baseRefName": lib.MAIN_BRANCH if rnd.random() < 0.9 else rnd.choice(["dev", "release/1.0"]),
+                "createdAt": iso(created),
+                "updatedAt": iso(updated),
+                "mergedAt": iso(ended) if state == "MERGED" else None,
+                "closedAt": iso(ended) if ended else None,
+                "author": {"login": author},
+                "assignees": [{"login": a} for a in rnd.sample(team, min(len(team), rnd.choice([0, 0, 1, 1, 2])))],
+                "labels": [{"name": l} for l in rnd.sample(labels, rnd.choice([0, 1, 1, 2, 3]))],
+                "url": f"https://github.com/example/repo/pull/{number}",
+            }
+        )
+    return prs
+
+
+# Run a pipeline stage, measuring time, or peak memory when traced. tracemalloc slows down
+# allocations, e.g. several times for load_prs(), so time is measured in a run without tracing.
+def measure(results, stage, traced, func, *args):
+    if not traced:
+        begin = time.perf_counter()
+        value = func(*args)
+        results[stage] = {"secs": round(time.perf_counter() - begin, 4)}
+        return value
+
+    tracemalloc.start()
+    value = func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    results[stage]["peak_mb"] = round(peak / 1024 / 1024, 2)
+    print(f"  {stage:<16} {results[stage]['secs']:9.3f} secs {peak / 1024 / 1024:9.1f} MB", file=sys.stderr)
+    return value
+
+
+# Run the pipeline stages on `count` synthetic PRs, in a temporary directory. The stages run twice,
+# with the same PRs: the first time to measure time, the second time to measure memory.
+def bench_pipeline(count):
+    results = dict()
+    print(f"{count} PRs", file=sys.stderr)
+    prs = gen_synthetic_prs(count)
+    base_dir = os.getcwd()
+    for traced in [False, True]:
+        with tempfile.TemporaryDirectory() as data_dir:
+            os.chdir(data_dir)
+            try:
+                with open(lib.JSON_FILE, "w") as output_file:
+                    json.dump(prs, output_file)
+
+                now = time.time()
+                date_from = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now - 86400 * 28))
+                date_to = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now))
+
+                measure(results, "update_csv", traced, lib.update_csv)
+                if lib.STORAGE == "csv":
+                    measure(results, "read_csv", traced, lib.read_csv)
+                table = measure(results, "load_prs", traced, lib.load_prs)
+                measure(results, "calc_pr_stats", traced, lib.calc_pr_stats, table, date_from, date_to)
+                measure(results, "calc_draw_stats", traced, lib.calc_draw_stats, table)
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    measure(results, "gen_report", traced, lib.gen_report)
+            finally:
+                os.chdir(base_dir)
+    return results
+
+
+# Compare results with the baseline, returning the stages slower than `tolerance`, e.g. 0.2 = 20% slower
+def find_regressions(results, baseline, tolerance):
+    regressions = []
+    for size, stages in results["sizes"].items():
+        for stage, value in stages.items():
+            old = baseline["sizes"].get(size, {}).get(stage)
+            # Ignore very fast stages, where the noise is larger than the tolerance
+            if old is None or old["secs"] < 0.01:
+                continue
+            if value["secs"] > old["secs"] * (1 + tolerance):
+                regressions.append(f"{size} PRs, {stage}: {old['secs']:.3f} => {value['secs']:.3f} secs")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PR stats benchmarks")
+    parser.add_argument("--sizes", default="1000,10000", help="number of PRs to generate, e.g. 1000,10000,100000")
+    parser.add_argument("--dates", action="store_true", help="benchmark date parsing only")
+    parser.add_argument("--save-baseline", action="store_true", help=f"save the results in {BASELINE_FILE}")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="slowdown reported as regression, default 0.2")
+    args = parser.parse_args()
+
+    if args.dates:
+        bench_dates()
+        return
+
+    results = dict()
+    results["date"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    results["python"] = platform.python_version()
+    results["stats_backend"] = lib.STATS_BACKEND
+    results["storage"] = lib.STORAGE
+    results["sizes"] = dict()
+    for size in args.sizes.split(","):
+        results["sizes"][size] = bench_pipeline(int(size))
+
+    with open(RESULTS_FILE, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+        return
+
+    if os.path.isfile(BASELINE_FILE):
+        with open(BASELINE_FILE) as input_file:
+            regressions = find_regressions(results, json.load(input_file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
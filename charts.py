@@ -0,0 +1,165 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+# Local rendering of the report charts, as SVG files saved next to report.md, see CHARTS in config.py.
+# Files are named after the hash of their content: unchanged charts are reused, not rewritten.
+
+import hashlib, html, math, os, subprocess
+
+WIDTH = 600
+HEIGHT = 300
+MARGIN_LEFT = 45
+MARGIN_RIGHT = 15
+MARGIN_TOP = 35
+MARGIN_BOTTOM = 60
+FONT = "font-family='Helvetica,Arial,sans-serif' font-size='11' fill='#666666'"
+
+
+# Split a Chart.js color, e.g. "#00539CFF", into SVG color and opacity
+def svg_color(value):
+    if len(value) == 9:
+        return value[:7], round(int(value[7:], 16) / 255, 2)
+    return value, 1
+
+
+# Round the max value of the Y axis up, and choose the distance between ticks, e.g. 1, 2, 5, 10, 20, 50...
+def y_axis_scale(max_value, ticks=5):
+    if max_value <= 0:
+        return 1, 1
+    step = 10 ** math.floor(math.log10(max_value / ticks))
+    for multiplier in [1, 2, 5, 10]:
+        if max_value / (step * multiplier) <= ticks:
+            step = step * multiplier
+            break
+    return math.ceil(max_value / step) * step, step
+
+
+# Format a number for the SVG file, short and deterministic
+def n2s(value):
+    return f"{value:.1f}".rstrip("0").rstrip(".")
+
+
+# Render a line chart as SVG. `datasets` is a list of dicts with label, data (list of numbers
+# as strings), border and background colors, and fill, same as the datasets of Chart.js.
+def render_svg(labels, datasets):
+    plot_width = WIDTH - MARGIN_LEFT - MARGIN_RIGHT
+    plot_height = HEIGHT - MARGIN_TOP - MARGIN_BOTTOM
+    bottom = MARGIN_TOP + plot_height
+
+    values = [[float(v) for v in d["data"]] for d in datasets]
+    y_max, y_step = y_axis_scale(max([max(v) for v in values if v] + [0]))
+
+    def x(i):
+        if len(labels) < 2:
+            return MARGIN_LEFT + plot_width / 2
+        return MARGIN_LEFT + plot_width * i / (len(labels) - 1)
+
+    def y(value):
+        return bottom - plot_height * value / y_max
+
+    svg = [
+        f"<svg xmlns='http://www.w3.org/2000/svg' width='{WIDTH}' height='{HEIGHT}' viewBox='0 0 {WIDTH} {HEIGHT}'>",
+        f"<rect width='{WIDTH}' height='{HEIGHT}' fill='#FFFFFF'/>",
+    ]
+
+    # Y axis: grid lines and values
+    for k in range(round(y_max / y_step) + 1):
+        tick = k * y_step
+        svg.append(
+            f"<line x1='{MARGIN_LEFT}' y1='{n2s(y(tick))}' x2='{WIDTH - MARGIN_RIGHT}' y2='{n2s(y(tick))}'"
+            + " stroke='#E5E5E5'/>"
+        )
+        svg.append(f"<text x='{MARGIN_LEFT - 5}' y='{n2s(y(tick) + 4)}' text-anchor='end' {FONT}>{n2s(tick)}</text>")
+
+    # X axis: dates, skipping some when there are too many to fit
+    every = max(1, math.ceil(len(labels) / 20))
+    for i, label in enumerate(labels):
+        if i % every != 0:
+            continue
+        svg.append(
+            f"<text x='{n2s(x(i))}' y='{bottom + 12}' text-anchor='end' transform='rotate(-45 {n2s(x(i))} {bottom + 12})'"
+            + f" {FONT}>{html.escape(label)}</text>"
+        )
+
+    # Datasets, the first one is drawn on top of the others, as in Chart.js
+    for dataset, data in reversed(list(zip(datasets, values))):
+        points = " ".join(f"{n2s(x(i))},{n2s(y(v))}" for i, v in enumerate(data))
+        if not points:
+            continue
+        if dataset["fill"]:
+            color, opacity = svg_color(dataset["background"])
+            area = f"{n2s(x(0))},{n2s(bottom)} {points} {n2s(x(len(data) - 1))},{n2s(bottom)}"
+            svg.append(f"<polygon points='{area}' fill='{color}' fill-opacity='{opacity}'/>")
+        color, opacity = svg_color(dataset["border"])
+        svg.append(
+            f"<polyline points='{points}' fill='none' stroke='{color}' stroke-opacity='{opacity}' stroke-width='2'/>"
+        )
+
+    # Legend, centered at the top
+    legend_x = WIDTH / 2 - sum(len(d["label"]) * 6 + 30 for d in datasets) / 2
+    for dataset in datasets:
+        color, opacity = svg_color(dataset["background"])
+        border, border_opacity = svg_color(dataset["border"])
+        svg.append(
+            f"<rect x='{n2s(legend_x)}' y='10' width='30' height='10' fill='{color}' fill-opacity='{opacity}'"
+            + f" stroke='{border}' stroke-opacity='{border_opacity}'/>"
+        )
+        svg.append(f"<text x='{n2s(legend_x + 35)}' y='19' {FONT}>{html.escape(dataset['label'])}</text>")
+        legend_x += len(dataset["label"]) * 6 + 45
+
+    svg.append("</svg>")
+    return "\n".join(svg) + "\n"
+
+
+# Save a chart in the charts directory, unless a chart with the same content exists. Returns the file name.
+def save_chart(svg, charts_dir):
+    file_name = hashlib.sha256(svg.encode("utf-8")).hexdigest()[:16] + ".svg"
+    path = os.path.join(charts_dir, file_name)
+    if not os.path.isfile(path):
+        os.makedirs(charts_dir, exist_ok=True)
+        with open(path, "w") as output_file:
+            output_file.write(svg)
+    return file_name
+
+
+# Delete the charts not linked in the current report, e.g. the charts of the previous reports.
+# The report text is checked, instead of tracking the charts saved, because charts can be
+# saved by other processes, see REPORT_WORKERS.
+def prune_charts(charts_dir, report_text):
+    if os.path.isdir(charts_dir):
+        for file_name in os.listdir(charts_dir):
+            if file_name.endswith(".svg") and file_name not in report_text:
+                os.remove(os.path.join(charts_dir, file_name))
+
+
+# Raw URL prefix of the files in a gist, e.g. "https://gist.githubusercontent.com/<user>/<gist id>/raw/".
+# The gist can be an id or a URL, e.g. "https://gist.github.com/<user>/<gist id>".
+def gist_raw_url(gist, gh_cli="gh"):
+    gist_id = gist.rstrip("/").split("/")[-1]
+    cmd = [gh_cli, "api", f"gists/{gist_id}", "--jq", ".owner.login"]
+    owner = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout.strip()
+    return f"https://gist.githubusercontent.com/{owner}/{gist_id}/raw/"
+
+
+# Upload a report and its charts to a gist. New charts are uploaded before the report, the charts
+# not used anymore are removed after it. Charts already in the gist are not uploaded again, their
+# content never changes. Charts are linked in the report using CHARTS_URL, see config.py. Gist files
+# are not in folders: when CHARTS_URL is not set, the links to charts_dir are changed to the gist raw URL.
+def publish_report(gist, report_file="report.md", charts_dir="charts", gh_cli="gh"):
+    charts = set(f for f in os.listdir(charts_dir) if f.endswith(".svg")) if os.path.isdir(charts_dir) else set()
+    uploaded = set()
+    if charts:
+        cmd = [gh_cli, "gist", "view", gist, "--files"]
+        uploaded = set(subprocess.run(cmd, check=True, capture_output=True, text=True).stdout.split())
+
+    for file_name in sorted(charts - uploaded):
+        subprocess.run([gh_cli, "gist", "edit", gist, "--add", os.path.join(charts_dir, file_name)], check=True)
+
+    with open(report_file, "r") as input_file:
+        text = input_file.read()
+    local_link = f"]({charts_dir}/"
+    if local_link in text:
+        text = text.replace(local_link, "](" + gist_raw_url(gist, gh_cli))
+    subprocess.run([gh_cli, "gist", "edit", gist, os.path.basename(report_file)], input=text, text=True, check=True)
+
+    for file_name in sorted(f for f in uploaded - charts if f.endswith(".svg")):
+        subprocess.run([gh_cli, "gist", "edit", gist, "--remove", file_name], check=True)
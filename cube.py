@@ -0,0 +1,344 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+# Pre-calculated stats sliced by label, author, author category and target branch, see CUBE_FILE in config.py.
+#
+# The cube contains the histograms used by calc_pr_stats() for each (week, dimension, value), e.g.
+# (2024-01-01, "label", "bug"), so the weekly stats of any slice are read without scanning the PRs.
+# Only the histograms of PRs by days open and by days to close of each author category are saved,
+# the other totals (counts, averages, internal and external PRs) are calculated from them.
+# Weeks are ISO weeks (starting on Monday, UTC), only complete weeks are saved. Drafts are not
+# counted, same as the report. Labels, authors and categories count only PRs on MAIN_BRANCH.
+#
+# The cube is updated with the PRs changed since the last update (the PRs in JSON_FILE), after
+# update_csv(): the cube keeps the few values needed to count each PR again (see pr_record), so the
+# old version of a changed PR is subtracted, and the new version added. Complete weeks are added as
+# time passes.
+#
+# Usage:
+#   python cube.py update                   update the cube, see 2-update-csv.sh
+#   python cube.py series label bug         weekly stats of a slice, e.g. PRs with label "bug"
+#   python cube.py top author               top authors by PRs closed in the last 4 weeks
+
+import lib
+from lib import to_epoch
+from timing import timed
+import datetime, json, math, os, sys, time
+
+WEEK = 7 * 24 * 3600
+ONE_DAY = 24 * 3600
+
+# 1970-01-05, the first Monday after the epoch, weeks start on Monday
+MONDAY = 4 * ONE_DAY
+
+# Version of the cube file, increased when the content changes, to recreate the cube
+CUBE_VERSION = 2
+
+DIMENSIONS = ["label", "author", "category", "branch"]
+
+
+# Beginning of the week containing a date, as epoch seconds
+def week_begin(t):
+    return t - (t - MONDAY) % WEEK
+
+
+def week_key(t):
+    return time.strftime("%Y-%m-%d", time.gmtime(t))
+
+
+# Values counted for a PR: updated, created, ended (0 if open), branch, author, labels. Drafts are
+# not counted, only the update date is saved. The author category is calculated from the author.
+def pr_record(prs, i):
+    if prs.is_draft[i]:
+        return [prs.updated[i]]
+    return [prs.updated[i], prs.created[i], prs.ended[i], prs.branch[i], prs.author[i], prs.labels[i]]
+
+
+# Slices including a PR, as (dimension, value) tuples. Author categories are not saved, see dimension_cells()
+def pr_slices(record):
+    branch, author, labels = record[3:]
+    slices = [("branch", branch)]
+    if branch == lib.MAIN_BRANCH:
+        slices += [("author", author)]
+        slices += [("label", label) for label in labels.split(",") if label]
+    return slices
+
+
+# Add (sign=1) or subtract (sign=-1) a counter in a histogram of PRs by days, removing empty counters
+def add_days(hist, days, sign):
+    key = str(days)
+    hist[key] = hist.get(key, 0) + sign
+    if hist[key] == 0:
+        del hist[key]
+
+
+# Number of PRs and total days of a histogram of PRs by days
+def hist_count(hist):
+    return sum(hist.values())
+
+
+def hist_days(hist):
+    return sum(int(days) * count for days, count in hist.items())
+
+
+# Add (sign=1) or subtract (sign=-1) a PR to the cells of the weeks in [first_week, last_week).
+# Same calculations as calc_windows_stats(), using the week end as end of the date range.
+# A cell contains, for each author category, the histograms of PRs by days open and by days to close.
+def add_pr(cube, record, first_week, last_week, sign):
+    if len(record) == 1:
+        return
+    created, ended, branch, author = record[1:5]
+    is_open = ended == 0
+    category = lib.get_author_index().category(author, created)
+
+    # Weeks ending after the PR was created, and starting before it was closed
+    begin = max(first_week, week_begin(created) - WEEK)
+    end = last_week if is_open else min(last_week, week_begin(ended) + WEEK)
+    slices = pr_slices(record)
+
+    for week in range(begin, end, WEEK):
+        end_period = week + WEEK
+        pr_end = end_period if is_open else ended
+        if pr_end < week or created > end_period:
+            continue
+
+        days_open = math.ceil((min(pr_end, end_period) - created) / ONE_DAY)
+        closed = not is_open and pr_end <= end_period
+
+        for dimension, value in slices:
+            cells = cube["cells"].setdefault(dimension, dict()).setdefault(value, dict())
+            cell = cells.setdefault(week_key(week), dict())
+            open_days_hist, days_to_close_hist = cell.setdefault(category, [dict(), dict()])
+            add_days(open_days_hist, days_open, sign)
+            if closed:
+                add_days(days_to_close_hist, days_open, sign)
+
+            # Remove the cells left empty by PRs subtracted
+            if not open_days_hist:
+                del cell[category]
+                if not cell:
+                    del cells[week_key(week)]
+                    if not cells:
+                        del cube["cells"][dimension][value]
+
+
+# Settings affecting the cube: when they change, the cube is recreated
+def cube_fingerprint():
+    return f"{CUBE_VERSION}|{lib.stats_cache_fingerprint()}"
+
+
+# Read the cube saved in CUBE_FILE, None if missing or created with different settings
+def read_cube():
+    if not os.path.isfile(lib.CUBE_FILE):
+        return None
+    with open(lib.CUBE_FILE, "r") as input_file:
+        cube = json.load(input_file)
+    return cube if cube.get("fingerprint") == cube_fingerprint() else None
+
+
+def write_cube(cube):
+    with open(lib.CUBE_FILE + ".tmp", "w") as output_file:
+        json.dump(cube, output_file, separators=(",", ":"))
+    os.replace(lib.CUBE_FILE + ".tmp", lib.CUBE_FILE)
+
+
+# Create the cube with all the PRs stored
+def create_cube(now_week):
+    cube = {"fingerprint": cube_fingerprint(), "through": now_week, "prs": dict(), "cells": dict()}
+    prs = lib.load_prs()
+    for i in range(len(prs)):
+        record = pr_record(prs, i)
+        cube["prs"][str(prs.number[i])] = record
+        add_pr(cube, record, 0, now_week, 1)
+    return cube
+
+
+# Update the cube with the PRs in JSON_FILE changed since the last update, and add the weeks
+# completed since the last update. The cube is created the first time, and when the settings
+# change. Returns the number of PRs updated.
+@timed
+def update_cube():
+    if not lib.CUBE_FILE:
+        return 0
+
+    now_week = week_begin(int(datetime.datetime.now(datetime.timezone.utc).timestamp()))
+    cube = read_cube()
+    if cube is None:
+        cube = create_cube(now_week)
+        write_cube(cube)
+        return len(cube["prs"])
+
+    changed = []
+    for pr in lib.iter_json_array(lib.JSON_FILE):
+        row = lib.pr_to_row(pr)
+        record = cube["prs"].get(str(row["number"]))
+        if record is None or record[0] != to_epoch(row["updatedAt"]):
+            changed.append(row)
+
+    # Replace the old version of the PRs changed
+    prs = lib.rows_to_prs(changed)
+    for i in range(len(prs)):
+        old = cube["prs"].get(str(prs.number[i]))
+        if old is not None:
+            add_pr(cube, old, 0, cube["through"], -1)
+        record = pr_record(prs, i)
+        add_pr(cube, record, 0, cube["through"], 1)
+        cube["prs"][str(prs.number[i])] = record
+
+    # Weeks completed since the last update
+    if now_week > cube["through"]:
+        for record in cube["prs"].values():
+            add_pr(cube, record, cube["through"], now_week, 1)
+        cube["through"] = now_week
+
+    write_cube(cube)
+    return len(changed)
+
+
+# Counters of PRs by days open, from a histogram of PRs by days open, see count_open_days()
+def hist_to_open_by_days(hist):
+    result = lib.new_open_by_days()
+    for days, count in hist.items():
+        counters = lib.new_open_by_days()
+        lib.count_open_days(counters, int(days))
+        for key, value in counters.items():
+            result[key] += value * count
+    return result
+
+
+# Convert the histograms of a cell to a stats result, same as calc_pr_stats()
+def cell_to_pr_stats(cell):
+    result = lib.new_pr_stats()
+    for external in [True, False]:
+        hists = [hists for category, hists in cell.items() if (category in lib.EXTERNAL_CATEGORIES) == external]
+        open_days_hist = lib.merge_histograms(*(hist for hist, _ in hists))
+        days_to_close_hist = lib.merge_histograms(*(hist for _, hist in hists))
+        lib.save_pr_stats(
+            result,
+            external,
+            hist_count(open_days_hist),
+            hist_count(days_to_close_hist),
+            hist_days(open_days_hist),
+            hist_days(days_to_close_hist),
+            hist_to_open_by_days(open_days_hist),
+            open_days_hist,
+            days_to_close_hist,
+        )
+    for category, (open_days_hist, days_to_close_hist) in cell.items():
+        result.category_count[category] = hist_count(open_days_hist)
+        result.category_closed_count[category] = hist_count(days_to_close_hist)
+        result.category_days_to_close[category] = hist_days(days_to_close_hist)
+    return result
+
+
+# Cells of each value of a dimension, as {value: {week: cell}}. The cells of the author categories are
+# taken from the cells of MAIN_BRANCH, where PRs are already counted by author category.
+def dimension_cells(cube, dimension):
+    if dimension != "category":
+        return cube["cells"].get(dimension, dict())
+    result = dict()
+    for week, cell in cube["cells"].get("branch", dict()).get(lib.MAIN_BRANCH, dict()).items():
+        for category, hists in cell.items():
+            result.setdefault(category, dict())[week] = {category: hists}
+    return result
+
+
+# Weekly stats of a slice, e.g. weekly_series(cube, "label", "bug"), as (week, stats result) tuples,
+# from the oldest week. Weeks without PRs are included, with empty stats.
+def weekly_series(cube, dimension, value, weeks=None):
+    cells = dimension_cells(cube, dimension).get(value, dict())
+    first = week_begin(min(to_epoch(f"{key}T00:00:00Z") for key in cells)) if cells else cube["through"]
+    if weeks is not None:
+        first = cube["through"] - weeks * WEEK
+    return [
+        (week_key(week), cell_to_pr_stats(cells.get(week_key(week), dict())))
+        for week in range(first, cube["through"], WEEK)
+    ]
+
+
+# Values of a dimension with most PRs closed in the last complete weeks, e.g. the top 10 labels.
+# Closed PRs are counted in the week they were closed, so the weeks can be added up, except PRs closed
+# exactly at midnight between two weeks, counted in both, same as calc_windows_stats().
+def top_values(cube, dimension, weeks=4, count=10):
+    week_keys = [week_key(cube["through"] - w * WEEK) for w in range(weeks, 0, -1)]
+    top = []
+    for value, cells in dimension_cells(cube, dimension).items():
+        hist = lib.merge_histograms(*(hists[1] for key in week_keys for hists in cells.get(key, dict()).values()))
+        closed = hist_count(hist)
+        top.append(
+            {
+                "value": value,
+                "closed": closed,
+                "avg_days_to_close": hist_days(hist) / closed if closed else 0,
+                "days_to_close_hist": hist,
+                "last_week_count": sum(hist_count(hists[0]) for hists in cells.get(week_keys[-1], dict()).values()),
+            }
+        )
+    top.sort(key=lambda row: (-row["closed"], -row["last_week_count"], row["value"]))
+    return top[:count]
+
+
+# Print the weekly stats of a slice, see weekly_series()
+def print_series(series):
+    print("Week | PRs | Closed | Avg days open | Avg days to close | p50/p90 days to close")
+    print("---- | --- | ------ | ------------- | ----------------- | ---------------------")
+    for week, s in series:
+        count = s.int_count + s.ext_count
+        closed = s.int_closed_count + s.ext_closed_count
+        avg_open = (s.int_avg_open_days * s.int_count + s.ext_avg_open_days * s.ext_count) / count if count else 0
+        avg_close = (
+            (s.int_avg_days_to_close * s.int_closed_count + s.ext_avg_days_to_close * s.ext_closed_count) / closed
+            if closed
+            else 0
+        )
+        hist = lib.merge_histograms(s.int_days_to_close_hist, s.ext_days_to_close_hist)
+        print(
+            f"{week} | {count} | {closed} | {avg_open:.1f} | {avg_close:.1f}"
+            + f" | {lib.percentile(hist, 50)} / {lib.percentile(hist, 90)}"
+        )
+
+
+# Print the top values of a dimension, see top_values()
+def print_top_values(dimension, top, weeks=4):
+    print(f"## Top {dimension}s, last {weeks} weeks\n")
+    print(f"{dimension.capitalize()} | Closed | Avg days to close | p50/p90 days to close | PRs last week")
+    print(f"{'-' * len(dimension)} | ------ | ----------------- | --------------------- | -------------")
+    for row in top:
+        hist = row["days_to_close_hist"]
+        print(
+            f"{row['value']} | {row['closed']} | {row['avg_days_to_close']:.1f}"
+            + f" | {lib.percentile(hist, 50)} / {lib.percentile(hist, 90)} | {row['last_week_count']}"
+        )
+    print("")
+
+
+def main():
+    usage = f"Usage: python {sys.argv[0]} update | series <dimension> <value> | top <dimension>"
+    if len(sys.argv) < 2 or sys.argv[1] not in ["update", "series", "top"]:
+        print(usage, file=sys.stderr)
+        sys.exit(2)
+    if not lib.CUBE_FILE:
+        print('Set CUBE_FILE in config.py, e.g. CUBE_FILE = "cube.json"', file=sys.stderr)
+        sys.exit(1)
+
+    if sys.argv[1] == "update":
+        print(f"{update_cube()} PRs updated")
+        return
+
+    dimension = sys.argv[2] if len(sys.argv) > 2 else ""
+    if dimension not in DIMENSIONS or (sys.argv[1] == "series" and len(sys.argv) < 4):
+        print(usage + f"\nDimensions: {', '.join(DIMENSIONS)}", file=sys.stderr)
+        sys.exit(2)
+
+    cube = read_cube()
+    if cube is None:
+        print("Cube not found, or created with different settings, run: python cube.py update", file=sys.stderr)
+        sys.exit(1)
+
+    if sys.argv[1] == "series":
+        print_series(weekly_series(cube, dimension, sys.argv[3]))
+    else:
+        print_top_values(dimension, top_values(cube, dimension, count=lib.CUBE_TOP))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+# Long running alternative to run.sh: keeps the PRs and the report stats in memory, and updates
+# them with GitHub webhooks, re-rendering report.md a few seconds after the last change.
+#
+# Usage:
+#   python daemon.py                        listen for webhooks on DAEMON_HOST:DAEMON_PORT, see config.py
+#   python daemon.py --insecure             same, accepting webhooks without signature, e.g. for local tests
+#   python daemon.py --replay events.jsonl  apply the webhook payloads saved in a file, render the report and exit
+#   python daemon.py --send events.jsonl --url http://localhost:8088/webhook
+#                                           send the payloads saved in a file to a daemon, e.g. to test it locally
+#
+# On GitHub, add a webhook sending "Pull requests" events to http://<host>:<DAEMON_PORT>/webhook,
+# content type "application/json", using WEBHOOK_SECRET as secret. The daemon doesn't start without
+# WEBHOOK_SECRET, unless --insecure is used. By default it listens only on 127.0.0.1, e.g. behind a
+# reverse proxy: set DAEMON_HOST = "0.0.0.0" to receive the webhooks directly.
+# Run 1-download-json.sh and 2-update-csv.sh before starting the daemon, to load all the PRs: webhooks
+# are not sent for the changes made while the daemon is not running.
+#
+# The charts use date ranges aligned to the calendar, weeks unless WINDOW_GRANULARITY is "day" or "month":
+# rolling ranges end at the time of the report, so they change at each render and no stats could be reused.
+#
+# Files with webhook payloads contain one JSON payload per line.
+
+import config
+import lib
+from charts import publish_report
+from pipeline import REPORT_MAX_AGE
+from storage import db_read, db_upsert, to_text
+import argparse, contextlib, datetime, hashlib, hmac, json, os, sys, threading, time, urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Optional settings, using defaults if missing in config.py
+DAEMON_HOST = getattr(config, "DAEMON_HOST", "127.0.0.1")
+DAEMON_PORT = getattr(config, "DAEMON_PORT", 8088)
+DAEMON_DEBOUNCE = getattr(config, "DAEMON_DEBOUNCE", 10)
+WEBHOOK_SECRET = getattr(config, "WEBHOOK_SECRET", "")
+
+# With frequent changes, render the report at least once every few debounce intervals
+MAX_DEBOUNCES = 6
+
+
+# Author login in the format downloaded by `gh pr list`: REST API bot logins, e.g. "dependabot[bot]",
+# are saved as "app/dependabot", see also fetch.node_to_author(). User is null for deleted accounts.
+def webhook_to_author(user):
+    if user is None:
+        return {"login": "ghost"}
+    if user.get("type") == "Bot":
+        login = user["login"]
+        return {"login": "app/" + (login[: -len("[bot]")] if login.endswith("[bot]") else login)}
+    return {"login": user["login"]}
+
+
+# Convert a PR received with a webhook (GitHub REST API format) to the format downloaded by `gh pr list`
+def webhook_to_pr(pr):
+    if pr.get("merged_at"):
+        state = "MERGED"
+    elif pr["state"] == "closed":
+        state = "CLOSED"
+    else:
+        state = "OPEN"
+
+    return {
+        "number": pr["number"],
+        "state": state,
+        "closed": pr["state"] == "closed",
+        "isDraft": pr.get("draft", False),
+        "title": pr["title"],
+        "baseRefName": pr["base"]["ref"],
+        "createdAt": pr["created_at"],
+        "updatedAt": pr["updated_at"],
+        "mergedAt": pr.get("merged_at"),
+        "closedAt": pr.get("closed_at"),
+        "author": webhook_to_author(pr.get("user")),
+        "assignees": [{"login": a["login"]} for a in pr.get("assignees", [])],
+        "labels": [{"name": l["name"]} for l in pr.get("labels", [])],
+        "url": pr["html_url"],
+    }
+
+
+# Convert a webhook payload to a CSV row, None if the payload is not about a PR
+def payload_to_row(payload):
+    if "pull_request" not in payload:
+        return None
+    row = lib.pr_to_row(webhook_to_pr(payload["pull_request"]))
+    # Same values found in the CSV file, e.g. True => "True", None => ""
+    return {name: to_text(value) for name, value in row.items()}
+
+
+# Check the signature of a webhook payload, sent in the X-Hub-Signature-256 header.
+# Without WEBHOOK_SECRET all payloads are accepted, serve() allows it only with --insecure.
+def is_valid_signature(body, signature):
+    if not WEBHOOK_SECRET:
+        return True
+    expected = "sha256=" + hmac.new(WEBHOOK_SECRET.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature or "")
+
+
+# Interval of time a PR is active, (created, merged/closed), as epoch seconds, None if not in the report
+def pr_interval(row):
+    if row is None or row["branch"] != lib.MAIN_BRANCH or lib.to_bool(row["isDraft"]):
+        return None
+    end = {"MERGED": row["mergedAt"], "CLOSED": row["closedAt"]}.get(row["state"])
+    return lib.to_epoch(row["createdAt"]), lib.to_epoch(end) if end else sys.maxsize
+
+
+class Daemon:
+    def __init__(self, title, gist=""):
+        self.title = title
+        self.gist = gist
+        # All the PRs, same as read_csv()
+        self.rows = dict()
+        # Same PRs, converted once, sorted by PR number, and the position of each PR
+        self.prs = lib.PrTable()
+        self.positions = dict()
+        # Stats of each chart date range, reused until a PR overlapping the range changes
+        self.window_stats = dict()
+        # PRs changed in memory and not saved in storage yet, e.g. after an error
+        self.unsaved = dict()
+        # PRs received and not applied yet, and when the first and last were received
+        self.pending = dict()
+        self.first_event = 0
+        self.last_event = 0
+        self.last_render = 0
+        self.lock = threading.Lock()
+
+    # Load all the PRs from the CSV file or the SQLite database, see STORAGE
+    def load(self):
+        if lib.STORAGE == "sqlite":
+            rows = db_read(lib.DB_FILE, lib.FIELDS)
+        else:
+            lib.create_csv()
+            rows = lib.read_csv().values()
+        self.rows = dict(sorted((f"{row['number']}".zfill(8), row) for row in rows))
+        self.load_prs()
+
+    # Convert all the PRs, e.g. after loading them
+    def load_prs(self):
+        self.prs = lib.rows_to_prs(self.rows.values())
+        self.positions = {key: i for i, key in enumerate(self.rows.keys())}
+
+    # Update a PR in the converted PRs, without converting the others
+    def update_pr(self, key, row):
+        if key in self.positions:
+            self.prs.replace(self.positions[key], row)
+        elif not self.positions or key > next(reversed(self.positions)):
+            self.positions[key] = len(self.prs)
+            self.prs.append(row)
+        else:
+            # New PR received out of order, e.g. with webhooks delayed
+            self.rows = dict(sorted(self.rows.items()))
+            self.load_prs()
+
+    # Queue a PR received with a webhook, applied later by apply_pending()
+    def receive(self, row):
+        now = time.time()
+        with self.lock:
+            key = f"{row['number']}".zfill(8)
+            if key not in self.pending or row["updatedAt"] >= self.pending[key]["updatedAt"]:
+                self.pending[key] = row
+            if not self.first_event:
+                self.first_event = now
+            self.last_event = now
+
+    # Check if the report must be rendered: changes received, with no more changes in the last
+    # DAEMON_DEBOUNCE seconds, or report older than REPORT_MAX_AGE minutes
+    def is_render_due(self, now):
+        with self.lock:
+            if self.pending:
+                return now - self.last_event >= DAEMON_DEBOUNCE or (
+                    now - self.first_event >= DAEMON_DEBOUNCE * MAX_DEBOUNCES
+                )
+        return REPORT_MAX_AGE > 0 and now - self.last_render >= REPORT_MAX_AGE * 60
+
+    # Update the PRs in memory and in storage. The stats of the chart date ranges affected by the changes
+    # are discarded first, so they are recalculated by the next render, even if saving the PRs fails.
+    def apply_pending(self):
+        with self.lock:
+            pending = self.pending
+            self.pending = dict()
+            self.first_event = 0
+
+        for key, row in pending.items():
+            old = self.rows.get(key)
+            # Webhooks can arrive out of order, ignore older versions of the PR
+            if old is not None and old["updatedAt"] > row["updatedAt"]:
+                continue
+            self.discard_window_stats([i for i in [pr_interval(old), pr_interval(row)] if i is not None])
+            self.rows[key] = row
+            self.update_pr(key, row)
+            self.unsaved[key] = row
+
+        # PRs not saved are saved with the next changes, if saving fails
+        if self.unsaved:
+            if lib.STORAGE == "sqlite":
+                db_upsert(lib.DB_FILE, lib.FIELDS, self.unsaved.values())
+            else:
+                self.rows = dict(sorted(self.rows.items()))
+                lib.write_csv(self.rows)
+            self.unsaved = dict()
+
+    # Discard the stats of the chart date ranges overlapping some intervals of time, see pr_interval()
+    def discard_window_stats(self, intervals):
+        for key in list(self.window_stats.keys()):
+            w = [lib.to_epoch(date) for date in key.split("|")]
+            if any(begin <= w[1] and end >= w[0] for begin, end in intervals):
+                del self.window_stats[key]
+
+    # Calculate the stats of the chart date ranges, reusing the stats of the ranges not affected by the changes
+    def calc_draw_stats(self, prs, now):
+        keys, windows = lib.get_chart_windows(now)
+
+        missing = [(key, w) for key, w in zip(keys, windows) if key not in self.window_stats]
+        # calc_windows_stats() needs the ranges in ascending order
+        missing.reverse()
+        results = lib.calc_windows_stats(prs, [w for key, w in missing])
+        for (key, w), result in zip(missing, results):
+            self.window_stats[key] = result
+
+        stats = lambda: None
+        stats.period = {key: self.window_stats[key] for key in keys}
+        self.window_stats = stats.period.copy()
+        return stats
+
+    # Apply the changes received, and render the report: the stats depending on the current time
+    # are recalculated, the stats of the chart date ranges only if affected by the changes
+    def render(self):
+        self.apply_pending()
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        prs = lib.filter_prs(self.prs, lib.MAIN_BRANCH, False, lib.get_report_since(now))
+        report = lib.build_report_model(self.title, now, prs, self.calc_draw_stats(prs, now))
+
+        # Write the report in a temporary file first, so readers never see a partial report
+        with open("report.md.tmp", "w") as report_file:
+            with contextlib.redirect_stdout(report_file):
+                lib.print_report(report)
+        os.replace("report.md.tmp", "report.md")
+        lib.save_report(report)
+
+        if self.gist:
+            publish_report(self.gist, "report.md", lib.CHARTS_DIR)
+
+        self.last_render = time.time()
+        print(f"{now.strftime('%Y-%m-%d %H:%M:%S')} report updated", file=sys.stderr)
+
+    # Render the report when due, until stopped
+    def run(self, stop):
+        while not stop.is_set():
+            if self.is_render_due(time.time()):
+                try:
+                    self.render()
+                except Exception as e:
+                    print(f"Report update failed: {e!r}", file=sys.stderr)
+            stop.wait(1)
+
+
+# Receive the webhooks, queueing the PR changes in the daemon
+def make_handler(daemon):
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/webhook":
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if not is_valid_signature(body, self.headers.get("X-Hub-Signature-256")):
+                self.send_response(401)
+                self.end_headers()
+                return
+
+            # Other events, e.g. "ping" sent when the webhook is created, are ignored
+            if self.headers.get("X-GitHub-Event") == "pull_request":
+                try:
+                    row = payload_to_row(json.loads(body))
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+                if row is not None:
+                    daemon.receive(row)
+
+            self.send_response(202)
+            self.end_headers()
+
+        # Don't log each request
+        def log_message(self, format, *args):
+            pass
+
+    return WebhookHandler
+
+
+# Listen for webhooks, until interrupted
+def serve(daemon, host, port):
+    server = ThreadingHTTPServer((host, port), make_handler(daemon))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Listening on {host}:{port}", file=sys.stderr)
+
+    stop = threading.Event()
+    try:
+        daemon.run(stop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        # Changes received and not applied yet
+        if daemon.pending:
+            daemon.render()
+
+
+# Read the webhook payloads saved in a file, one per line
+def read_payloads(file_name):
+    with open(file_name, "r") as input_file:
+        for line in input_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+# Apply the webhook payloads saved in a file, and render the report once
+def replay(daemon, file_name):
+    for payload in read_payloads(file_name):
+        row = payload_to_row(payload)
+        if row is not None:
+            daemon.receive(row)
+    daemon.render()
+
+
+# Send the webhook payloads saved in a file, as GitHub does, e.g. to test the daemon locally
+def send(file_name, url):
+    for payload in read_payloads(file_name):
+        body = json.dumps(payload).encode("utf-8")
+        headers = {"Content-Type": "application/json", "X-GitHub-Event": "pull_request"}
+        if WEBHOOK_SECRET:
+            digest = hmac.new(WEBHOOK_SECRET.encode("utf-8"), body, hashlib.sha256).hexdigest()
+            headers["X-Hub-Signature-256"] = f"sha256={digest}"
+        with urllib.request.urlopen(urllib.request.Request(url, data=body, headers=headers)) as response:
+            response.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PR stats daemon, updating the report with GitHub webhooks")
+    parser.add_argument("--host", default=DAEMON_HOST, help=f"address to listen on, default {DAEMON_HOST}")
+    parser.add_argument("--port", type=int, default=DAEMON_PORT, help=f"port to listen on, default {DAEMON_PORT}")
+    parser.add_argument("--insecure", action="store_true", help="accept webhooks without signature, see WEBHOOK_SECRET")
+    parser.add_argument("--title", default="Semantic Kernel", help="report title")
+    parser.add_argument("--gist", default=os.environ.get("GIST", ""), help="gist where to upload the report")
+    parser.add_argument("--replay", metavar="FILE", help="apply the webhook payloads saved in a file, and exit")
+    parser.add_argument("--send", metavar="FILE", help="send the webhook payloads saved in a file to --url")
+    parser.add_argument("--url", default=f"http://localhost:{DAEMON_PORT}/webhook", help="daemon URL, see --send")
+    args = parser.parse_args()
+
+    if args.send:
+        send(args.send, args.url)
+        return
+
+    # Without a secret anyone reaching the port could change the PRs stored and the report
+    if not args.replay and not WEBHOOK_SECRET and not args.insecure:
+        print(
+            "Set WEBHOOK_SECRET in config.py, or use --insecure to accept webhooks without signature", file=sys.stderr
+        )
+        sys.exit(1)
+
+    # Only the current range changes between renders, see the comments at the top of the file
+    if lib.WINDOW_GRANULARITY == "rolling":
+        print('The daemon uses WINDOW_GRANULARITY = "week", rolling date ranges change at each render', file=sys.stderr)
+        lib.WINDOW_GRANULARITY = "week"
+
+    daemon = Daemon(args.title, args.gist)
+    daemon.load()
+    if args.replay:
+        replay(daemon, args.replay)
+        return
+
+    daemon.render()
+    serve(daemon, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
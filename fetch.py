@@ -0,0 +1,130 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+import config
+from config import JSON_FILE
+from lib import read_watermark
+import json, subprocess
+
+# Optional settings, using defaults if missing in config.py
+GH_CLI = getattr(config, "GH_CLI", "gh")
+REPO_DIR = getattr(config, "REPO_DIR", "repo")
+
+PAGE_SIZE = 100
+
+# Fields downloaded by `gh pr list`, see also 1-download-json.sh
+PR_LIST_FIELDS = (
+    "id,number,state,assignees,author,baseRefName,closed,closedAt,createdAt,headRefName,headRepository,"
+    + "headRepositoryOwner,isCrossRepository,isDraft,maintainerCanModify,mergeStateStatus,mergeable,mergedAt,"
+    + "mergedBy,updatedAt,url,title,labels"
+)
+
+# PR fields downloaded via GraphQL, see node_to_pr()
+PR_NODE_FIELDS = """
+        number state closed isDraft title baseRefName
+        createdAt updatedAt mergedAt closedAt url
+        author { __typename login }
+        assignees(first: 100) { nodes { login } }
+        labels(first: 100) { nodes { name } }
+"""
+
+# PRs sorted by last update, most recent first. {owner} and {repo} are
+# replaced by `gh` using the repository cloned in REPO_DIR.
+PRS_QUERY = (
+    """
+query($owner: String!, $repo: String!, $pageSize: Int!, $endCursor: String) {
+  repository(owner: $owner, name: $repo) {
+    pullRequests(first: $pageSize, after: $endCursor, orderBy: {field: UPDATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {"""
+    + PR_NODE_FIELDS
+    + """      }
+    }
+  }
+}
+"""
+)
+
+
+# Download the most recent 2500 PRs, same as 1-download-json.sh
+def download_json():
+    cmd = [GH_CLI, "pr", "list", "--state", "all", "--limit", "2500", "--json", PR_LIST_FIELDS]
+    with open(JSON_FILE, "w") as output_file:
+        subprocess.run(cmd, cwd=REPO_DIR, check=True, stdout=output_file)
+
+
+# Download a page of PRs, using GitHub GraphQL API via `gh`
+def fetch_page(cursor):
+    cmd = [
+        GH_CLI,
+        "api",
+        "graphql",
+        "-F",
+        "owner={owner}",
+        "-F",
+        "repo={repo}",
+        "-F",
+        f"pageSize={PAGE_SIZE}",
+        "-f",
+        f"query={PRS_QUERY}",
+    ]
+    if cursor:
+        cmd += ["-f", f"endCursor={cursor}"]
+
+    output = subprocess.run(cmd, cwd=REPO_DIR, check=True, capture_output=True, text=True).stdout
+    return json.loads(output)["data"]["repository"]["pullRequests"]
+
+
+# Author login in the format used by `gh pr list --json`, where bots are "app/<name>", e.g. "app/dependabot",
+# while GraphQL returns only the name. Author is null for deleted accounts.
+def node_to_author(author):
+    if author is None:
+        return {"login": "ghost"}
+    if author.get("__typename") == "Bot":
+        return {"login": "app/" + author["login"]}
+    return {"login": author["login"]}
+
+
+# Convert a GraphQL PR to the format used by `gh pr list --json`
+def node_to_pr(node):
+    return {
+        "number": node["number"],
+        "state": node["state"],
+        "closed": node["closed"],
+        "isDraft": node["isDraft"],
+        "title": node["title"],
+        "baseRefName": node["baseRefName"],
+        "createdAt": node["createdAt"],
+        "updatedAt": node["updatedAt"],
+        "mergedAt": node["mergedAt"],
+        "closedAt": node["closedAt"],
+        "author": node_to_author(node["author"]),
+        "assignees": node["assignees"]["nodes"],
+        "labels": node["labels"]["nodes"],
+        "url": node["url"],
+    }
+
+
+# Download the PRs changed since the last update of the CSV file, or all the PRs
+# the first time. The JSON file contains only the changed PRs, which update_csv()
+# merges into the CSV file.
+def download_json_incremental():
+    watermark = read_watermark()
+    prs = []
+    cursor = None
+    while True:
+        page = fetch_page(cursor)
+        done = False
+        for node in page["nodes"]:
+            # PRs are sorted by update date, stop at the first PR not changed.
+            # PRs updated in the same second of the watermark are downloaded again.
+            if node["updatedAt"] < watermark:
+                done = True
+                break
+            prs.append(node_to_pr(node))
+
+        if done or not page["pageInfo"]["hasNextPage"]:
+            break
+        cursor = page["pageInfo"]["endCursor"]
+
+    with open(JSON_FILE, "w") as output_file:
+        json.dump(prs, output_file)
@@ -0,0 +1,158 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+import config
+from config import JSON_FILE
+import lib
+from fetch import GH_CLI, REPO_DIR, PR_NODE_FIELDS, node_to_pr
+import asyncio, json, os, subprocess, time
+import aiohttp
+
+# Optional settings, using defaults if missing in config.py
+REPO = getattr(config, "REPO", "")
+GITHUB_API_URL = getattr(config, "GITHUB_API_URL", "https://api.github.com/graphql")
+MAX_CONNECTIONS = getattr(config, "MAX_CONNECTIONS", 8)
+
+PAGE_SIZE = 100
+MAX_RETRIES = 6
+
+# PRs are downloaded with one stream of pages for each state, running concurrently
+STATES = ["OPEN", "CLOSED", "MERGED"]
+
+# PRs with the given states, sorted by last update, most recent first
+PRS_QUERY = (
+    """
+query($owner: String!, $repo: String!, $states: [PullRequestState!], $pageSize: Int!, $endCursor: String) {
+  repository(owner: $owner, name: $repo) {
+    pullRequests(first: $pageSize, after: $endCursor, states: $states, orderBy: {field: UPDATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {"""
+    + PR_NODE_FIELDS
+    + """      }
+    }
+  }
+}
+"""
+)
+
+
+# GitHub token, from the environment or from `gh` if missing
+def get_token():
+    token = os.environ.get("GITHUB_TOKEN") or os.environ.get("GH_TOKEN")
+    if not token:
+        token = subprocess.run([GH_CLI, "auth", "token"], check=True, capture_output=True, text=True).stdout.strip()
+    return token
+
+
+# Name of the repository cloned in REPO_DIR, e.g. "microsoft/semantic-kernel", unless set in config.py
+def get_repo_name():
+    if REPO:
+        return REPO
+    cmd = [GH_CLI, "repo", "view", "--json", "nameWithOwner", "--jq", ".nameWithOwner"]
+    return subprocess.run(cmd, cwd=REPO_DIR, check=True, capture_output=True, text=True).stdout.strip()
+
+
+# Seconds to wait before retrying a request, using GitHub rate limit headers when available
+def retry_delay(headers, attempt):
+    if "retry-after" in headers:
+        return int(headers["retry-after"])
+    if headers.get("x-ratelimit-remaining") == "0" and "x-ratelimit-reset" in headers:
+        return max(0, int(headers["x-ratelimit-reset"]) - time.time()) + 1
+    return 2**attempt
+
+
+# Send a GraphQL query, retrying with backoff when rate limited or on server errors
+async def graphql(session, query, variables):
+    for attempt in range(MAX_RETRIES):
+        async with session.post(GITHUB_API_URL, json={"query": query, "variables": variables}) as response:
+            if response.status in (403, 429) or response.status >= 500:
+                await asyncio.sleep(retry_delay(response.headers, attempt))
+                continue
+            response.raise_for_status()
+            body = await response.json()
+
+            errors = body.get("errors")
+            if errors and any(e.get("type") == "RATE_LIMITED" for e in errors):
+                await asyncio.sleep(retry_delay(response.headers, attempt))
+                continue
+            if errors:
+                raise RuntimeError(f"GraphQL error: {errors[0].get('message')}")
+
+            # Out of requests: wait for the rate limit reset before returning,
+            # so the next page doesn't fail
+            if response.headers.get("x-ratelimit-remaining") == "0":
+                await asyncio.sleep(retry_delay(response.headers, attempt))
+
+            return body["data"]
+
+    raise RuntimeError(f"GraphQL request failed after {MAX_RETRIES} attempts")
+
+
+# Download the PRs with the given state changed since the watermark, one page at a time
+async def fetch_prs(session, owner, name, state, watermark):
+    prs = []
+    cursor = None
+    while True:
+        variables = {"owner": owner, "repo": name, "states": [state], "pageSize": PAGE_SIZE, "endCursor": cursor}
+        page = (await graphql(session, PRS_QUERY, variables))["repository"]["pullRequests"]
+        for node in page["nodes"]:
+            # PRs are sorted by update date, stop at the first PR not changed
+            if node["updatedAt"] < watermark:
+                return prs
+            prs.append(node_to_pr(node))
+
+        if not page["pageInfo"]["hasNextPage"]:
+            return prs
+        cursor = page["pageInfo"]["endCursor"]
+
+
+# Download the PRs of a repository changed since the watermark, e.g. "owner/repo"
+async def fetch_repo(session, repo, watermark):
+    owner, name = repo.split("/")
+    streams = await asyncio.gather(*(fetch_prs(session, owner, name, state, watermark) for state in STATES))
+
+    # A PR changing state during the download can be found twice, keep the most recent
+    prs = dict()
+    for stream in streams:
+        for pr in stream:
+            if pr["number"] not in prs or pr["updatedAt"] > prs[pr["number"]]["updatedAt"]:
+                prs[pr["number"]] = pr
+    return list(prs.values())
+
+
+# Download multiple repositories at once, sharing a pool of MAX_CONNECTIONS HTTP connections.
+# `repos` is a list of (repo name, watermark). Returns a list of PRs, or the exception, for each repo.
+async def fetch_repos(repos):
+    headers = {"Authorization": f"bearer {get_token()}"}
+    connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS)
+    async with aiohttp.ClientSession(headers=headers, connector=connector) as session:
+        return await asyncio.gather(*(fetch_repo(session, r, w) for r, w in repos), return_exceptions=True)
+
+
+# Download the PRs changed since the last run, writing JSON_FILE, same as fetch.download_json_incremental()
+def download_json_async():
+    prs = asyncio.run(fetch_repos([(get_repo_name(), lib.read_watermark())]))[0]
+    if isinstance(prs, Exception):
+        raise prs
+
+    with open(JSON_FILE, "w") as output_file:
+        json.dump(prs, output_file)
+
+
+# Download the PRs of the repositories in REPOS, writing JSON_FILE in each repository directory.
+# Returns a list with the error of each repository, None if the download succeeded.
+def download_repos_async(repos):
+    watermarks = [lib.read_watermark(os.path.join(repo["dir"], lib.WATERMARK_FILE)) for repo in repos]
+    results = asyncio.run(fetch_repos([(repo["name"], w) for repo, w in zip(repos, watermarks)]))
+
+    errors = []
+    for repo, prs in zip(repos, results):
+        if isinstance(prs, Exception):
+            errors.append(f"Download failed: {prs!r}")
+            continue
+
+        os.makedirs(repo["dir"], exist_ok=True)
+        with open(os.path.join(repo["dir"], JSON_FILE), "w") as output_file:
+            json.dump(prs, output_file)
+        errors.append(None)
+
+    return errors
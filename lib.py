@@ -1,10 +1,50 @@
 # Author: Devis Lucato, https://github.com/dluc
 
+import config
 from config import MAIN_BRANCH, CSV_FILE, JSON_FILE, FIELDS, TEAM_MEMBERS
-import json, os, csv, datetime, math
+import json, os, csv, datetime, math, bisect, itertools, calendar, hashlib, io, contextlib, multiprocessing, threading
+from concurrent.futures import ProcessPoolExecutor
+from array import array
 from dateutil.parser import parse
 from dateutil.relativedelta import relativedelta
 import urllib.parse
+from storage import open_db, db_upsert, db_read
+import timing
+from timing import timed, print_timings
+from authors import load_author_index, external_categories, CATEGORIES
+from charts import render_svg, save_chart, prune_charts
+from snapshot import Snapshot, write_snapshot, is_snapshot_current
+
+# numpy is optional, used only by the "numpy" stats backend
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Optional settings, using defaults if missing in config.py
+STATS_BACKEND = getattr(config, "STATS_BACKEND", "python")
+WATERMARK_FILE = getattr(config, "WATERMARK_FILE", "prs.watermark")
+STORAGE = getattr(config, "STORAGE", "csv")
+DB_FILE = getattr(config, "DB_FILE", "prs.db")
+SHOW_TIMINGS = getattr(config, "SHOW_TIMINGS", False)
+STATS_CACHE_FILE = getattr(config, "STATS_CACHE_FILE", "")
+WINDOW_GRANULARITY = getattr(config, "WINDOW_GRANULARITY", "rolling")
+HISTORY_DAYS = getattr(config, "HISTORY_DAYS", 120)
+AUTHORS_FILE = getattr(config, "AUTHORS_FILE", "")
+ORG_MEMBERS_FILE = getattr(config, "ORG_MEMBERS_FILE", "")
+BOTS_EXTERNAL = getattr(config, "BOTS_EXTERNAL", True)
+CHARTS = getattr(config, "CHARTS", "quickchart")
+CHARTS_DIR = getattr(config, "CHARTS_DIR", "charts")
+CHARTS_URL = getattr(config, "CHARTS_URL", "")
+STATS_JSON_FILE = getattr(config, "STATS_JSON_FILE", "")
+STATS_PARQUET_FILE = getattr(config, "STATS_PARQUET_FILE", "")
+SNAPSHOT_FILE = getattr(config, "SNAPSHOT_FILE", "")
+TIMELINE_FILE = getattr(config, "TIMELINE_FILE", "")
+REPORT_WORKERS = getattr(config, "REPORT_WORKERS", 1)
+CUBE_FILE = getattr(config, "CUBE_FILE", "")
+CUBE_TOP = getattr(config, "CUBE_TOP", 10)
+
+EXTERNAL_CATEGORIES = external_categories(BOTS_EXTERNAL)
 
 
 # Create CSV file if missing
@@ -17,6 +57,7 @@ def create_csv():
 
 
 # Read CSV file and return PRs as a dict, sorted by PR number
+@timed
 def read_csv():
     with open(CSV_FILE, "r", newline="\n") as data_file:
         reader = csv.DictReader(data_file, fieldnames=FIELDS, dialect="unix", quoting=csv.QUOTE_MINIMAL)
@@ -37,90 +78,560 @@ def read_csv():
     return data
 
 
-# Update the CSV file using the new data from the JSON file
+# Write the CSV file, with the PRs returned by read_csv()
+def write_csv(data):
+    with open(CSV_FILE, "w", newline="\n") as data_file:
+        writer = csv.DictWriter(data_file, fieldnames=FIELDS, dialect="unix", quoting=csv.QUOTE_MINIMAL)
+        writer.writeheader()
+        for row in data.values():
+            writer.writerow(row)
+
+    if SNAPSHOT_FILE:
+        save_snapshot(data)
+
+
+# Read the most recent PR `updatedAt` date saved in the CSV file, empty if unknown
+def read_watermark(file_name=None):
+    file_name = file_name or WATERMARK_FILE
+    if not os.path.isfile(file_name):
+        return ""
+    with open(file_name, "r") as input_file:
+        return input_file.read().strip()
+
+
+# Save the most recent PR `updatedAt` date, used to download only PRs changed since then
+def write_watermark(value):
+    with open(WATERMARK_FILE, "w") as output_file:
+        output_file.write(value + "\n")
+
+
+# Convert a PR downloaded from GitHub to a CSV row
+def pr_to_row(pr):
+    # List of assignees
+    assignees = ""
+    for assignee in pr["assignees"]:
+        assignees += assignee["login"] + ","
+    if assignees != "":
+        assignees = assignees[:-1]
+
+    # List of labels
+    labels = ""
+    for label in pr["labels"]:
+        labels += label["name"] + ","
+    if labels != "":
+        labels = labels[:-1]
+
+    return {
+        "number": pr["number"],
+        "state": pr["state"],
+        "closed": pr["closed"],
+        "isDraft": pr["isDraft"],
+        "title": pr["title"],
+        "branch": pr["baseRefName"],
+        "createdAt": pr["createdAt"],
+        "updatedAt": pr["updatedAt"],
+        "mergedAt": pr["mergedAt"],
+        "closedAt": pr["closedAt"],
+        "author": pr["author"]["login"],
+        "assignees": assignees,
+        "labels": labels,
+        "url": pr["url"],
+    }
+
+
+# Read a JSON file containing an array, one element at a time, without loading the whole file in memory.
+# Raises ValueError if the file is not a valid JSON array, same as json.load(), e.g. when the file is
+# truncated: PRs are never processed from a partial download.
+def iter_json_array(file_name, chunk_size=65536):
+    decoder = json.JSONDecoder()
+    with open(file_name, "r") as input_file:
+        buffer = ""
+        pos = 0
+        eof = False
+        # Next token: "[" (array start), "first" (an element or "]"), "element", "separator" ("," or "]")
+        expected = "["
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+
+            if pos < len(buffer):
+                char = buffer[pos]
+                if expected == "[":
+                    if char != "[":
+                        raise ValueError(f"{file_name} doesn't contain a JSON array")
+                    expected = "first"
+                    pos += 1
+                    continue
+
+                if char == "]" and expected in ["first", "separator"]:
+                    # Only whitespace is allowed after the array
+                    rest = buffer[pos + 1 :]
+                    while True:
+                        if rest.strip() != "":
+                            raise ValueError(f"Invalid JSON in {file_name}: extra data after the array")
+                        if eof:
+                            return
+                        rest = input_file.read(chunk_size)
+                        eof = rest == ""
+
+                if expected == "separator":
+                    if char != ",":
+                        raise ValueError(f"Invalid JSON in {file_name}: expected ',' or ']' at position {pos}")
+                    expected = "element"
+                    pos += 1
+                    continue
+
+                # Decode the next element. An element is complete only when followed by a delimiter,
+                # e.g. a number at the end of the buffer might continue in the next chunk.
+                try:
+                    element, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    end = None
+
+                if end is not None and end < len(buffer) and (buffer[end].isspace() or buffer[end] in ",]"):
+                    yield element
+                    pos = end
+                    expected = "separator"
+                    continue
+
+                if eof:
+                    raise ValueError(f"Invalid JSON in {file_name}: array not closed, the file might be truncated")
+
+            if eof:
+                if expected == "[":
+                    raise ValueError(f"{file_name} doesn't contain a JSON array")
+                raise ValueError(f"Invalid JSON in {file_name}: array not closed, the file might be truncated")
+
+            chunk = input_file.read(chunk_size)
+            eof = chunk == ""
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+
+# Read the PRs from the JSON file one at a time, converted to CSV rows.
+# `latest.updated_at` is set to the most recent `updatedAt` found.
+def read_json_rows(latest):
+    for pr in iter_json_array(JSON_FILE):
+        row = pr_to_row(pr)
+        if row["updatedAt"] > latest.updated_at:
+            latest.updated_at = row["updatedAt"]
+        yield row
+
+
+# Update the CSV file (or the SQLite database, see STORAGE) using the new data from the JSON file.
+# The JSON file is read one PR at a time, so memory usage doesn't depend on the file size.
+# Returns the number of PRs updated.
+@timed
 def update_csv():
-    create_csv()
-    data = read_csv()
+    latest = lambda: None
+    latest.updated_at = read_watermark()
+    rows = read_json_rows(latest)
 
-    # Read JSON data
-    with open(JSON_FILE) as input_file:
-        prs = json.load(input_file)
+    # Create the storage anyway, so the next stages can read it, e.g. a repo without PRs
+    if STORAGE == "sqlite":
+        open_db(DB_FILE, FIELDS).close()
+    else:
+        create_csv()
+
+    # Nothing to do, e.g. no PRs changed since the last incremental download
+    first_row = next(rows, None)
+    if first_row is None:
+        return 0
+    rows = itertools.chain([first_row], rows)
+
+    if STORAGE == "sqlite":
+        count = db_upsert(DB_FILE, FIELDS, rows)
+        write_watermark(latest.updated_at)
+        return count
+
+    data = read_csv()
+    sort = False
 
     # Update CSV data with new PRs
-    for pr in prs:
-        key = f"{pr['number']}".zfill(8)
-
-        # List of assignees
-        assignees = ""
-        for assignee in pr["assignees"]:
-            assignees += assignee["login"] + ","
-        if assignees != "":
-            assignees = assignees[:-1]
-
-        # List of labels
-        labels = ""
-        for label in pr["labels"]:
-            labels += label["name"] + ","
-        if labels != "":
-            labels = labels[:-1]
-
-        data[key] = {
-            "number": pr["number"],
-            "state": pr["state"],
-            "closed": pr["closed"],
-            "isDraft": pr["isDraft"],
-            "title": pr["title"],
-            "branch": pr["baseRefName"],
-            "createdAt": pr["createdAt"],
-            "updatedAt": pr["updatedAt"],
-            "mergedAt": pr["mergedAt"],
-            "closedAt": pr["closedAt"],
-            "author": pr["author"]["login"],
-            "assignees": assignees,
-            "labels": labels,
-            "url": pr["url"],
-        }
+    count = 0
+    for row in rows:
+        count += 1
+        key = f"{row['number']}".zfill(8)
+        if key not in data:
+            sort = True
+        data[key] = row
+
+    # Sort CSV data by key, only needed when there are new PRs
+    if sort:
+        data = dict(sorted(data.items()))
+
+    write_csv(data)
+
+    # Save the watermark only after the CSV file is updated
+    write_watermark(latest.updated_at)
+    return count
+
+
+# Use the main branch and team members of one of the repositories in REPOS, see multi.py
+def use_repo(repo):
+    global MAIN_BRANCH, TEAM_MEMBERS, CHARTS_URL, author_index
+    MAIN_BRANCH = repo.get("main_branch", config.MAIN_BRANCH)
+    TEAM_MEMBERS = repo.get("team_members", config.TEAM_MEMBERS)
+    CHARTS_URL = repo.get("charts_url", getattr(config, "CHARTS_URL", ""))
+    author_index = None
+
+
+# Author categories (team, former team members, bots, external), see authors.py
+author_index = None
+
+
+# Get the author index, loaded once per run
+def get_author_index():
+    global author_index
+    if author_index is None:
+        author_index = load_author_index(TEAM_MEMBERS, AUTHORS_FILE, ORG_MEMBERS_FILE)
+    return author_index
+
+
+# PR states, stored as small integers in the PR table
+STATE_OPEN = 0
+STATE_CLOSED = 1
+STATE_MERGED = 2
+STATES = {"OPEN": STATE_OPEN, "CLOSED": STATE_CLOSED, "MERGED": STATE_MERGED}
+
+
+# Convert a CSV boolean, e.g. "True", "TRUE", "False", or a boolean from the JSON file
+def to_bool(value):
+    return str(value).upper() == "TRUE"
+
+
+# Convert a date to epoch seconds, 0 if the date is missing
+# Date format: YYYY-MM-DDTHH:MM:SSZ, e.g. 2023-02-27T21:35:12Z, the format used by GitHub.
+# Other formats are supported using dateutil, which is a lot slower.
+def to_epoch(value):
+    if not value:
+        return 0
+
+    if (
+        len(value) == 20
+        and value[4] == "-"
+        and value[7] == "-"
+        and value[10] == "T"
+        and value[13] == ":"
+        and value[16] == ":"
+        and value[19] == "Z"
+    ):
+        try:
+            year, month, day = int(value[0:4]), int(value[5:7]), int(value[8:10])
+            hour, minute, second = int(value[11:13]), int(value[14:16]), int(value[17:19])
+        except ValueError:
+            year = 0
+        if year > 0 and 1 <= month <= 12 and 1 <= day <= 31 and hour < 24 and minute < 60 and second < 60:
+            return calendar.timegm((year, month, day, hour, minute, second))
+
+    return int(parse(value).timestamp())
+
+
+# Convert a row from the CSV file to the values stored in a PrTable, see PrTable.add()
+def row_to_values(row):
+    state = STATES[row["state"]]
+    if state == STATE_MERGED:
+        ended = to_epoch(row["mergedAt"])
+    elif state == STATE_CLOSED:
+        ended = to_epoch(row["closedAt"])
+    else:
+        ended = 0
+
+    return (
+        int(row["number"]),
+        state,
+        to_bool(row["isDraft"]),
+        to_epoch(row["createdAt"]),
+        to_epoch(row["updatedAt"]),
+        ended,
+        row["branch"],
+        row["author"],
+        row["assignees"],
+        row["labels"],
+        row["title"],
+        row["url"],
+    )
 
-    # Sort CSV data by key
-    data = dict(sorted(data.items()))
 
-    # Write CSV data
-    with open(CSV_FILE, "w", newline="\n") as data_file:
-        writer = csv.DictWriter(data_file, fieldnames=FIELDS, dialect="unix", quoting=csv.QUOTE_MINIMAL)
-        writer.writeheader()
-        for new_data_row in data.values():
-            writer.writerow(new_data_row)
+# PRs loaded in memory once, and shared by all the stats functions.
+# Data is stored by column, sorted by PR number, with dates as epoch seconds.
+class PrTable:
+    def __init__(self):
+        self.number = array("q")
+        self.state = array("b")
+        self.is_draft = array("b")
+        self.is_external = array("b")
+        # Author category, index in authors.CATEGORIES
+        self.category = array("b")
+        self.created = array("q")
+        self.updated = array("q")
+        # Date the PR was merged or closed, 0 if still open
+        self.ended = array("q")
+        self.branch = []
+        self.author = []
+        self.assignees = []
+        self.labels = []
+        self.title = []
+        self.url = []
+        # numpy arrays, see columns()
+        self.np_columns = None
+
+    def __len__(self):
+        return len(self.number)
+
+    # Get the columns used by the stats as numpy arrays, created once and reused until the table changes.
+    # Arrays are copies, not views: an array can't grow while a view of its buffer exists (BufferError).
+    def columns(self):
+        if self.np_columns is None:
+            self.np_columns = lambda: None
+            self.np_columns.created = np.frombuffer(self.created, dtype=np.int64).copy()
+            self.np_columns.ended = np.frombuffer(self.ended, dtype=np.int64).copy()
+            self.np_columns.is_open = np.frombuffer(self.state, dtype=np.int8) == STATE_OPEN
+            self.np_columns.is_external = np.frombuffer(self.is_external, dtype=np.int8) == 1
+            self.np_columns.category = np.frombuffer(self.category, dtype=np.int8).copy()
+            self.np_columns.is_draft = np.frombuffer(self.is_draft, dtype=np.int8) == 1
+            self.np_columns.is_main = np.array([branch == MAIN_BRANCH for branch in self.branch], dtype=bool)
+        return self.np_columns
+
+    # Add a PR, using a row from the CSV file
+    def append(self, row):
+        self.add(*row_to_values(row))
+
+    # Replace the PR at position i, using a row from the CSV file, e.g. when the PR changes
+    def replace(self, i, row):
+        number, state, is_draft, created, updated, ended, branch, author, assignees, labels, title, url = row_to_values(
+            row
+        )
+        category = get_author_index().category(author, created)
+
+        self.number[i] = number
+        self.state[i] = state
+        self.is_draft[i] = is_draft
+        self.is_external[i] = category in EXTERNAL_CATEGORIES
+        self.category[i] = CATEGORIES.index(category)
+        self.created[i] = created
+        self.updated[i] = updated
+        self.ended[i] = ended
+        self.branch[i] = branch
+        self.author[i] = author
+        self.assignees[i] = assignees
+        self.labels[i] = labels
+        self.title[i] = title
+        self.url[i] = url
+        self.np_columns = None
+
+    # Add the PR at position i of another table, without converting the values again
+    def add_from(self, prs, i):
+        self.add(
+            prs.number[i],
+            prs.state[i],
+            prs.is_draft[i],
+            prs.created[i],
+            prs.updated[i],
+            prs.ended[i],
+            prs.branch[i],
+            prs.author[i],
+            prs.assignees[i],
+            prs.labels[i],
+            prs.title[i],
+            prs.url[i],
+        )
 
+    # Add a PR, using values already converted, e.g. from the snapshot
+    def add(self, number, state, is_draft, created, updated, ended, branch, author, assignees, labels, title, url):
+        category = get_author_index().category(author, created)
+
+        self.number.append(number)
+        self.state.append(state)
+        self.is_draft.append(is_draft)
+        self.is_external.append(category in EXTERNAL_CATEGORIES)
+        self.category.append(CATEGORIES.index(category))
+        self.created.append(created)
+        self.updated.append(updated)
+        self.ended.append(ended)
+        self.branch.append(branch)
+        self.author.append(author)
+        self.assignees.append(assignees)
+        self.labels.append(labels)
+        self.title.append(title)
+        self.url.append(url)
+        self.np_columns = None
+
+
+# Save all the PRs in SNAPSHOT_FILE, a compact copy of the CSV file loaded by load_prs(), see snapshot.py
+@timed
+def save_snapshot(data):
+    prs = rows_to_prs(data.values())
+    write_snapshot(
+        SNAPSHOT_FILE,
+        CSV_FILE,
+        len(prs),
+        {
+            "number": prs.number,
+            "state": prs.state,
+            "is_draft": prs.is_draft,
+            "created": prs.created,
+            "updated": prs.updated,
+            "ended": prs.ended,
+        },
+        {"branch": prs.branch, "author": prs.author, "assignees": prs.assignees, "labels": prs.labels},
+        {"title": prs.title, "url": prs.url},
+    )
 
-# Check if PR is from an external contributor
-def is_external_pr(pr):
-    if pr["author"] in TEAM_MEMBERS:
-        return False
-    else:
-        return True
 
+# Positions of the PRs in the snapshot matching the filters, see load_prs_snapshot(). With numpy the
+# filters are applied to whole columns, using arrays over the memory-mapped file without copying it.
+def snapshot_positions(snapshot, branch, include_drafts, active_since, updated_since):
+    c = snapshot.ints
+    branch_code = snapshot.tables["branch"].index(branch) if branch in snapshot.tables["branch"] else -1
+    active_since = to_epoch(active_since) if active_since is not None else None
+    updated_since = to_epoch(updated_since) if updated_since is not None else None
+
+    if np is None:
+        return [
+            i
+            for i in range(snapshot.count)
+            if (branch is None or c["branch"][i] == branch_code)
+            and (include_drafts or not c["is_draft"][i])
+            and (active_since is None or c["state"][i] == STATE_OPEN or c["ended"][i] >= active_since)
+            and (updated_since is None or c["updated"][i] > updated_since)
+        ]
+
+    # The arrays must be deleted before closing the snapshot, so they are not returned
+    def column(name):
+        return np.frombuffer(c[name], dtype=c[name].format)
+
+    selected = np.ones(snapshot.count, dtype=bool)
+    if branch is not None:
+        selected &= column("branch") == branch_code
+    if not include_drafts:
+        selected &= column("is_draft") == 0
+    if active_since is not None:
+        selected &= (column("state") == STATE_OPEN) | (column("ended") >= active_since)
+    if updated_since is not None:
+        selected &= column("updated") > updated_since
+    return np.flatnonzero(selected).tolist()
+
+
+# Read the PRs from SNAPSHOT_FILE, same filters and results as load_prs()
+def load_prs_snapshot(branch=None, include_drafts=True, active_since=None, updated_since=None):
+    prs = PrTable()
+    with Snapshot(SNAPSHOT_FILE) as snapshot:
+        positions = snapshot_positions(snapshot, branch, include_drafts, active_since, updated_since)
+        c = snapshot.ints
+
+        # Integer columns are copied from the snapshot, same types as PrTable
+        for name in ["number", "state", "is_draft", "created", "updated", "ended"]:
+            if np is not None:
+                getattr(prs, name).frombytes(np.frombuffer(c[name], dtype=c[name].format)[positions].tobytes())
+            else:
+                getattr(prs, name).extend(c[name][i] for i in positions)
+
+        for name in ["branch", "author", "assignees", "labels"]:
+            table = snapshot.tables[name]
+            setattr(prs, name, [table[c[name][i]] for i in positions])
+        prs.title = [snapshot.text("title", i) for i in positions]
+        prs.url = [snapshot.text("url", i) for i in positions]
+
+    # Author categories are not saved, they depend on the settings, see PrTable.add()
+    author_index = get_author_index()
+    for author, created in zip(prs.author, prs.created):
+        category = author_index.category(author, created)
+        prs.is_external.append(category in EXTERNAL_CATEGORIES)
+        prs.category.append(CATEGORIES.index(category))
+    return prs
+
+
+# Copy all the PRs from the CSV file to the SQLite database, e.g. when switching STORAGE to "sqlite"
+def import_csv_to_db():
+    db_upsert(DB_FILE, FIELDS, read_csv().values())
+
+
+# Check if a PR is still open, or was merged/closed after the given date
+# Date format: YYYY-MM-DDTHH:MM:SSZ, e.g. 2023-02-27T21:35:12Z
+def is_active_since(row, date):
+    if row["state"] == "MERGED":
+        return row["mergedAt"] >= date
+    if row["state"] == "CLOSED":
+        return row["closedAt"] >= date
+    return True
+
+
+# Read the PRs once, returning them in a PrTable. Optional filters:
+# - branch: only PRs targeting the branch
+# - include_drafts: whether to include draft PRs
+# - active_since: only PRs still open, or merged/closed after the date
+# - updated_since: only PRs updated after the date
+# When using SQLite the filters use the table indexes.
+@timed
+def load_prs(branch=None, include_drafts=True, active_since=None, updated_since=None):
+    prs = PrTable()
+
+    if STORAGE == "sqlite":
+        for row in db_read(DB_FILE, FIELDS, branch, include_drafts, active_since, updated_since):
+            prs.append(row)
+        return prs
+
+    # Use the snapshot, created from the CSV file the first time, and when the CSV file changes
+    if SNAPSHOT_FILE:
+        if not is_snapshot_current(SNAPSHOT_FILE, CSV_FILE):
+            save_snapshot(read_csv())
+        return load_prs_snapshot(branch, include_drafts, active_since, updated_since)
+
+    return rows_to_prs(read_csv().values(), branch, include_drafts, active_since, updated_since)
+
+
+# Create a PrTable with the PRs of another PrTable matching the filters, see load_prs().
+# Values are copied without converting them again, e.g. to filter the PRs kept in memory by the daemon.
+def filter_prs(prs, branch=None, include_drafts=True, active_since=None, updated_since=None):
+    active_since = to_epoch(active_since) if active_since is not None else None
+    updated_since = to_epoch(updated_since) if updated_since is not None else None
+    result = PrTable()
+    for i in range(len(prs)):
+        if branch is not None and prs.branch[i] != branch:
+            continue
+        if not include_drafts and prs.is_draft[i]:
+            continue
+        if active_since is not None and prs.state[i] != STATE_OPEN and prs.ended[i] < active_since:
+            continue
+        if updated_since is not None and prs.updated[i] <= updated_since:
+            continue
+        result.add_from(prs, i)
+    return result
+
+
+# Create a PrTable with the CSV rows matching the filters, see load_prs()
+def rows_to_prs(rows, branch=None, include_drafts=True, active_since=None, updated_since=None):
+    prs = PrTable()
+    for row in rows:
+        if branch is not None and row["branch"] != branch:
+            continue
+        if not include_drafts and to_bool(row["isDraft"]):
+            continue
+        if active_since is not None and not is_active_since(row, active_since):
+            continue
+        if updated_since is not None and row["updatedAt"] <= updated_since:
+            continue
+        prs.append(row)
+    return prs
 
-# Get the date the PR was closed or merged (or Now if still open)
-def get_pr_end_date(pr, current=datetime.datetime.now(datetime.timezone.utc)):
-    if pr["state"] == "MERGED":
-        return parse(pr["mergedAt"])
-    if pr["state"] == "CLOSED":
-        return parse(pr["closedAt"])
-    return current
 
+# Get the date the PR was closed or merged (or `current` if still open), as epoch seconds
+def get_pr_end_date(prs, i, current):
+    if prs.state[i] == STATE_OPEN:
+        return current
+    return prs.ended[i]
 
-# Calculate how many days the PR has been open
-def calc_open_time(pr):
-    begin = parse(pr["createdAt"])
-    end = get_pr_end_date(pr)
-    return int((end - begin).total_seconds())
 
+# Calculate how many seconds the PR has been open
+def calc_open_time(prs, i, now):
+    return get_pr_end_date(prs, i, now) - prs.created[i]
 
-# Calculate stats for a given date range
-# Date format: YYYY-MM-DDTHH:MM:SSZ, e.g. e.g. 2023-02-27T21:35:12Z
-def calc_pr_stats(date_from, date_to):
-    one_day = 3600 * 24
 
+# Create an empty stats result, see calc_pr_stats()
+def new_pr_stats():
     result = lambda: None
     result.int_count = 0
     result.ext_count = 0
@@ -132,41 +643,174 @@ def calc_pr_stats(date_from, date_to):
     result.ext_avg_open_days = 0
     result.int_avg_days_to_close = 0
     result.ext_avg_days_to_close = 0
+    # Number of PRs by days open and by days to close, e.g. {"3": 10}, see percentile()
+    result.int_open_days_hist = dict()
+    result.ext_open_days_hist = dict()
+    result.int_days_to_close_hist = dict()
+    result.ext_days_to_close_hist = dict()
+    # PRs by author category, e.g. category_count["bot"]
+    result.category_count = {category: 0 for category in CATEGORIES}
+    result.category_closed_count = {category: 0 for category in CATEGORIES}
+    result.category_days_to_close = {category: 0 for category in CATEGORIES}
+    return result
+
+
+# Update the counters by author category, see new_pr_stats()
+def count_category(result, category, days_open, closed):
+    category = CATEGORIES[category]
+    result.category_count[category] += 1
+    if closed:
+        result.category_closed_count[category] += 1
+        result.category_days_to_close[category] += days_open
+
+
+# Create the counters of PRs by days open
+def new_open_by_days():
+    open_count_by_days = dict()
+    open_count_by_days["5-"] = 0
+    open_count_by_days["5+"] = 0
+    open_count_by_days["10-"] = 0
+    open_count_by_days["10+"] = 0
+    open_count_by_days["15-"] = 0
+    open_count_by_days["15+"] = 0
+    open_count_by_days["20+"] = 0
+    open_count_by_days["30+"] = 0
+    return open_count_by_days
+
+
+# Update the counters of PRs by days open
+def count_open_days(open_count_by_days, days_open):
+    if days_open >= 30:
+        open_count_by_days["5+"] += 1
+        open_count_by_days["10+"] += 1
+        open_count_by_days["15+"] += 1
+        open_count_by_days["20+"] += 1
+        open_count_by_days["30+"] += 1
+    elif days_open >= 20:
+        open_count_by_days["5+"] += 1
+        open_count_by_days["10+"] += 1
+        open_count_by_days["15+"] += 1
+        open_count_by_days["20+"] += 1
+    elif days_open >= 15:
+        open_count_by_days["5+"] += 1
+        open_count_by_days["10+"] += 1
+        open_count_by_days["15+"] += 1
+    elif days_open >= 10:
+        open_count_by_days["5+"] += 1
+        open_count_by_days["10+"] += 1
+        open_count_by_days["15-"] += 1
+    elif days_open >= 5:
+        open_count_by_days["5+"] += 1
+        open_count_by_days["15-"] += 1
+        open_count_by_days["10-"] += 1
+    else:
+        open_count_by_days["15-"] += 1
+        open_count_by_days["10-"] += 1
+        open_count_by_days["5-"] += 1
+
+
+# Update a histogram of PRs by days, e.g. days open
+def count_days(hist, days):
+    key = str(days)
+    hist[key] = hist.get(key, 0) + 1
+
+
+# Merge histograms of different PRs, e.g. internal and external PRs, without recalculating the stats.
+# Histograms of consecutive date ranges can't be merged: the ranges share a boundary, see calc_pr_stats()
+def merge_histograms(*hists):
+    result = dict()
+    for hist in hists:
+        for key, count in hist.items():
+            result[key] = result.get(key, 0) + count
+    return result
+
+
+# Percentile of a histogram of PRs by days, e.g. percentile(hist, 90), 0 if there are no PRs.
+# Days are integers, so the histogram is small and the percentiles are exact.
+def percentile(hist, p):
+    total = sum(hist.values())
+    if total == 0:
+        return 0
+    rank = max(1, math.ceil(p / 100 * total))
+    seen = 0
+    for days in sorted(int(key) for key in hist):
+        seen += hist[str(days)]
+        if seen >= rank:
+            return days
+
+
+# Save the totals of external or internal PRs into a stats result
+def save_pr_stats(
+    result,
+    external,
+    pr_count,
+    closed_count,
+    total_open_days,
+    total_days_to_close,
+    open_count_by_days,
+    open_days_hist,
+    days_to_close_hist,
+):
+    # Averages
+    avg_open_days = 0
+    avg_days_to_close = 0
+    if pr_count > 0:
+        avg_open_days = total_open_days / pr_count
+    if closed_count > 0:
+        avg_days_to_close = total_days_to_close / closed_count
+
+    if external:
+        result.ext_open_by_days = open_count_by_days
+        result.ext_count = pr_count
+        result.ext_closed_count = closed_count
+        result.ext_avg_open_days = avg_open_days
+        result.ext_avg_days_to_close = avg_days_to_close
+        result.ext_open_days_hist = open_days_hist
+        result.ext_days_to_close_hist = days_to_close_hist
+    else:
+        result.int_open_by_days = open_count_by_days
+        result.int_count = pr_count
+        result.int_closed_count = closed_count
+        result.int_avg_open_days = avg_open_days
+        result.int_avg_days_to_close = avg_days_to_close
+        result.int_open_days_hist = open_days_hist
+        result.int_days_to_close_hist = days_to_close_hist
+
+
+# Calculate stats for a given date range
+# Date format: YYYY-MM-DDTHH:MM:SSZ, e.g. e.g. 2023-02-27T21:35:12Z
+@timed
+def calc_pr_stats(prs, date_from, date_to):
+    one_day = 3600 * 24
+
+    begin_period = to_epoch(date_from)
+    end_period = to_epoch(date_to)
+
+    if STATS_BACKEND == "numpy":
+        return calc_pr_stats_numpy(prs, begin_period, end_period)
+
+    result = new_pr_stats()
 
-    prs = read_csv()
     types = [True, False]
     for external in types:
         pr_count = 0
         closed_count = 0
         total_open_days = 0
         total_days_to_close = 0
-        avg_open_days = 0
-        avg_days_to_close = 0
-
-        open_count_by_days = dict()
-        open_count_by_days["5-"] = 0
-        open_count_by_days["5+"] = 0
-        open_count_by_days["10-"] = 0
-        open_count_by_days["10+"] = 0
-        open_count_by_days["15-"] = 0
-        open_count_by_days["15+"] = 0
-        open_count_by_days["20+"] = 0
-        open_count_by_days["30+"] = 0
-
-        for pr in prs.items():
-            pr = pr[1]
-
-            if external != is_external_pr(pr):
+        open_count_by_days = new_open_by_days()
+        open_days_hist = dict()
+        days_to_close_hist = dict()
+
+        for i in range(len(prs)):
+            if external != prs.is_external[i]:
                 continue
 
             # Ignore drafts, PRs on branches other than main
-            if pr["branch"] != MAIN_BRANCH or pr["isDraft"] == "TRUE":
+            if prs.branch[i] != MAIN_BRANCH or prs.is_draft[i]:
                 continue
 
-            begin_period = parse(date_from)
-            end_period = parse(date_to)
-            pr_begin = parse(pr["createdAt"])
-            pr_end = get_pr_end_date(pr, end_period)
+            pr_begin = prs.created[i]
+            pr_end = get_pr_end_date(prs, i, end_period)
 
             # Skip PRs outside the selected period
             if pr_end < begin_period or pr_begin > end_period:
@@ -176,77 +820,185 @@ def calc_pr_stats(date_from, date_to):
 
             # Calculate how many days the PR has been open
             if pr_end < end_period:
-                days_open = math.ceil((pr_end - pr_begin).total_seconds() / one_day)
+                days_open = math.ceil((pr_end - pr_begin) / one_day)
             else:
-                days_open = math.ceil((end_period - pr_begin).total_seconds() / one_day)
+                days_open = math.ceil((end_period - pr_begin) / one_day)
             total_open_days += days_open
 
             # Calculate how many days it took to close the PR
-            if (pr["state"] == "MERGED" or pr["state"] == "CLOSED") and pr_end <= end_period:
+            closed = prs.state[i] != STATE_OPEN and pr_end <= end_period
+            if closed:
                 total_days_to_close += days_open
                 closed_count += 1
-
-            # Averages
-            if pr_count > 0:
-                avg_open_days = total_open_days / pr_count
-            if closed_count > 0:
-                avg_days_to_close = total_days_to_close / closed_count
+                count_days(days_to_close_hist, days_open)
 
             # Counter by days open
-            if days_open >= 30:
-                open_count_by_days["5+"] += 1
-                open_count_by_days["10+"] += 1
-                open_count_by_days["15+"] += 1
-                open_count_by_days["20+"] += 1
-                open_count_by_days["30+"] += 1
-            elif days_open >= 20:
-                open_count_by_days["5+"] += 1
-                open_count_by_days["10+"] += 1
-                open_count_by_days["15+"] += 1
-                open_count_by_days["20+"] += 1
-            elif days_open >= 15:
-                open_count_by_days["5+"] += 1
-                open_count_by_days["10+"] += 1
-                open_count_by_days["15+"] += 1
-            elif days_open >= 10:
-                open_count_by_days["5+"] += 1
-                open_count_by_days["10+"] += 1
-                open_count_by_days["15-"] += 1
-            elif days_open >= 5:
-                open_count_by_days["5+"] += 1
-                open_count_by_days["15-"] += 1
-                open_count_by_days["10-"] += 1
-            else:
-                open_count_by_days["15-"] += 1
-                open_count_by_days["10-"] += 1
-                open_count_by_days["5-"] += 1
+            count_open_days(open_count_by_days, days_open)
+            count_days(open_days_hist, days_open)
+            count_category(result, prs.category[i], days_open, closed)
 
         # Save data for external and internal PRs
-        if external:
-            result.ext_open_by_days = open_count_by_days
-            result.ext_count = pr_count
-            result.ext_closed_count = closed_count
-            result.ext_avg_open_days = avg_open_days
-            result.ext_avg_days_to_close = avg_days_to_close
-        else:
-            result.int_open_by_days = open_count_by_days
-            result.int_count = pr_count
-            result.int_closed_count = closed_count
-            result.int_avg_open_days = avg_open_days
-            result.int_avg_days_to_close = avg_days_to_close
+        save_pr_stats(
+            result,
+            external,
+            pr_count,
+            closed_count,
+            total_open_days,
+            total_days_to_close,
+            open_count_by_days,
+            open_days_hist,
+            days_to_close_hist,
+        )
 
     return result
 
 
-# Calculate PR stats
-def print_stats2(weeks=4, with_header=True):
-    now = datetime.datetime.now(datetime.timezone.utc)
-    n_weeks_ago = now - relativedelta(weeks=weeks)
+# Histogram of PRs by days, from a numpy array of days, see count_days()
+def days_histogram(days):
+    values, counts = np.unique(days, return_counts=True)
+    return {str(int(v)): int(c) for v, c in zip(values, counts)}
+
+
+# Calculate stats for a given date range using numpy arrays, same results as calc_pr_stats()
+# Dates are epoch seconds.
+def calc_pr_stats_numpy(prs, begin_period, end_period):
+    if np is None:
+        raise RuntimeError("STATS_BACKEND 'numpy' requires numpy, install it with: pip install numpy")
+
+    one_day = 3600 * 24
+    c = prs.columns()
+
+    result = new_pr_stats()
+
+    # Ignore drafts, PRs on branches other than main, PRs outside the selected period
+    pr_end = np.where(c.is_open, end_period, c.ended)
+    selected = c.is_main & ~c.is_draft & (pr_end >= begin_period) & (c.created <= end_period)
+
+    # Days the PR has been open, rounded up
+    days_open = -((c.created - np.minimum(pr_end, end_period)) // one_day)
+    closed = ~c.is_open & (pr_end <= end_period)
+
+    # Counters by author category
+    categories = c.category[selected]
+    closed_categories = c.category[selected & closed]
+    count = np.bincount(categories, minlength=len(CATEGORIES)).tolist()
+    closed_count = np.bincount(closed_categories, minlength=len(CATEGORIES)).tolist()
+    category_days = np.bincount(closed_categories, days_open[selected & closed], minlength=len(CATEGORIES))
+    for code, category in enumerate(CATEGORIES):
+        result.category_count[category] = count[code]
+        result.category_closed_count[category] = closed_count[code]
+        result.category_days_to_close[category] = int(round(category_days[code]))
+
+    for external in [True, False]:
+        mask = selected & (c.is_external == external)
+        days = days_open[mask]
+        days_to_close = days_open[mask & closed]
+
+        # Count PRs by days open: <5, 5-9, 10-14, 15-19, 20-29, 30+
+        bins = np.bincount(np.searchsorted([5, 10, 15, 20, 30], days, side="right"), minlength=6).tolist()
+        open_count_by_days = new_open_by_days()
+        open_count_by_days["5-"] = bins[0]
+        open_count_by_days["5+"] = sum(bins[1:])
+        open_count_by_days["10-"] = sum(bins[:2])
+        open_count_by_days["10+"] = sum(bins[2:])
+        open_count_by_days["15-"] = sum(bins[:3])
+        open_count_by_days["15+"] = sum(bins[3:])
+        open_count_by_days["20+"] = sum(bins[4:])
+        open_count_by_days["30+"] = bins[5]
+
+        save_pr_stats(
+            result,
+            external,
+            len(days),
+            len(days_to_close),
+            int(days.sum()),
+            int(days_to_close.sum()),
+            open_count_by_days,
+            days_histogram(days),
+            days_histogram(days_to_close),
+        )
+
+    return result
+
+
+# Calculate stats for multiple date ranges, with a single pass over the PRs.
+# Ranges are (begin, end) tuples of epoch seconds, and both begin and end dates
+# must be in ascending order, e.g. consecutive weeks. The stats for each range
+# are the same returned by calc_pr_stats() for the same range.
+@timed
+def calc_windows_stats(prs, windows):
+    if STATS_BACKEND == "numpy":
+        return [calc_pr_stats_numpy(prs, w[0], w[1]) for w in windows]
+
+    one_day = 3600 * 24
+    begins = [w[0] for w in windows]
+    ends = [w[1] for w in windows]
+
+    # Totals for each range, for external and internal PRs:
+    # PR count, closed count, total open days, total days to close, counters by days open,
+    # histograms by days open and by days to close
+    totals = [
+        {
+            True: [0, 0, 0, 0, new_open_by_days(), dict(), dict()],
+            False: [0, 0, 0, 0, new_open_by_days(), dict(), dict()],
+        }
+        for w in windows
+    ]
+    results = [new_pr_stats() for w in windows]
+
+    for i in range(len(prs)):
+        # Ignore drafts, PRs on branches other than main
+        if prs.branch[i] != MAIN_BRANCH or prs.is_draft[i]:
+            continue
+
+        pr_begin = prs.created[i]
+        is_open = prs.state[i] == STATE_OPEN
+
+        # Ranges ending after the PR was created, and starting before it was closed
+        first = bisect.bisect_left(ends, pr_begin)
+        last = len(windows) if is_open else bisect.bisect_right(begins, prs.ended[i])
+
+        for w in range(first, last):
+            end_period = ends[w]
+            pr_end = end_period if is_open else prs.ended[i]
+            t = totals[w][prs.is_external[i]]
+
+            t[0] += 1
+
+            # Calculate how many days the PR has been open
+            if pr_end < end_period:
+                days_open = math.ceil((pr_end - pr_begin) / one_day)
+            else:
+                days_open = math.ceil((end_period - pr_begin) / one_day)
+            t[2] += days_open
+
+            # Calculate how many days it took to close the PR
+            closed = not is_open and pr_end <= end_period
+            if closed:
+                t[3] += days_open
+                t[1] += 1
+                count_days(t[6], days_open)
+
+            # Counter by days open
+            count_open_days(t[4], days_open)
+            count_days(t[5], days_open)
+            count_category(results[w], prs.category[i], days_open, closed)
+
+    for result, window_totals in zip(results, totals):
+        for external, t in window_totals.items():
+            save_pr_stats(result, external, *t)
 
-    s = calc_pr_stats(n_weeks_ago.strftime("%Y-%m-%dT%H:%M:%SZ"), now.strftime("%Y-%m-%dT%H:%M:%SZ"))
+    return results
 
+
+# Calculate PR stats
+def print_stats2(s, weeks=4, with_header=True):
     print(f"## Last {weeks} weeks")
 
+    # Median, 90th and 99th percentile, e.g. "2 / 9 / 31"
+    def p2s(hist):
+        return f"{percentile(hist, 50)} / {percentile(hist, 90)} / {percentile(hist, 99)}"
+
     if with_header:
         print("PR  | Internal | External")
         print("--- | -------- | --------")
@@ -254,6 +1006,8 @@ def print_stats2(weeks=4, with_header=True):
         print(f"Closed            | {s.int_closed_count} | {s.ext_closed_count}")
         print(f"Avg days to close | {s.int_avg_days_to_close:.1f} | {s.ext_avg_days_to_close:.1f}")
         print(f"Avg days open     | {s.int_avg_open_days:.1f} | {s.ext_avg_open_days:.1f}")
+        print(f"p50/p90/p99 days to close | {p2s(s.int_days_to_close_hist)} | {p2s(s.ext_days_to_close_hist)}")
+        print(f"p50/p90/p99 days open     | {p2s(s.int_open_days_hist)} | {p2s(s.ext_open_days_hist)}")
     else:
         print("Internal | External")
         print("-------- | --------")
@@ -261,6 +1015,8 @@ def print_stats2(weeks=4, with_header=True):
         print(f"{s.int_closed_count} | {s.ext_closed_count}")
         print(f"{s.int_avg_days_to_close:.1f} | {s.ext_avg_days_to_close:.1f}")
         print(f"{s.int_avg_open_days:.1f} | {s.ext_avg_open_days:.1f}")
+        print(f"{p2s(s.int_days_to_close_hist)} | {p2s(s.ext_days_to_close_hist)}")
+        print(f"{p2s(s.int_open_days_hist)} | {p2s(s.ext_open_days_hist)}")
 
     def c2s(count, total):
         return f"{count} ({count/total*100:.1f}%)"
@@ -289,103 +1045,306 @@ def print_stats2(weeks=4, with_header=True):
         print(f"{c2s(s.int_open_by_days['30+'], s.int_count)} | {c2s(s.ext_open_by_days['30+'], s.ext_count)}")
 
 
-def calc_draw_stats():
-    now = datetime.datetime.now(datetime.timezone.utc)
-    stats = lambda: None
-    stats.period = dict()
-    for i in range(0, 120, 7):
-        date_from = now - relativedelta(days=(i + 7))
-        date_to = now - relativedelta(days=i)
+# Print PRs by author category: team members, former team members, bots, external contributors
+def print_category_stats(s, weeks=4):
+    print(f"## PR authors, last {weeks} weeks\n")
+    print("Category | PRs | Closed | Avg days to close")
+    print("-------- | --- | ------ | -----------------")
+    for category in CATEGORIES:
+        closed = s.category_closed_count[category]
+        avg_days = s.category_days_to_close[category] / closed if closed else 0
+        print(f"{category} | {s.category_count[category]} | {closed} | {avg_days:.1f}")
+    print("")
+
+
+# Convert a stats result to a dict, e.g. to save it in a JSON file
+def pr_stats_to_dict(result):
+    return dict(vars(result))
+
+
+# Convert a dict created with pr_stats_to_dict() back to a stats result
+def dict_to_pr_stats(values):
+    result = new_pr_stats()
+    for name, value in values.items():
+        setattr(result, name, value)
+    return result
+
+
+# Version of the stats results, increased when new stats are added, to discard the cached stats
+STATS_VERSION = 2
+
+
+# Settings affecting the stats: when they change, the cached stats are discarded
+def stats_cache_fingerprint():
+    settings = [
+        STATS_VERSION,
+        STORAGE,
+        CSV_FILE,
+        DB_FILE,
+        MAIN_BRANCH,
+        sorted(TEAM_MEMBERS),
+        CATEGORIES,
+        EXTERNAL_CATEGORIES,
+    ]
+    fingerprint = hashlib.sha256(json.dumps(settings).encode("utf-8"))
+    for file_name in [AUTHORS_FILE, ORG_MEMBERS_FILE]:
+        if file_name and os.path.isfile(file_name):
+            with open(file_name, "rb") as input_file:
+                fingerprint.update(input_file.read())
+    return fingerprint.hexdigest()
+
+
+# Same as calc_windows_stats(), reusing the stats saved in STATS_CACHE_FILE by previous runs.
+# Each range is saved with the dataset watermark (most recent PR `updatedAt`) at the time the
+# stats were calculated. Stats are reused unless a PR updated since then overlaps the range,
+# so for ranges in the past usually only the current range needs to be calculated.
+# Ranges not requested are removed from the cache, e.g. old weeks.
+@timed
+def calc_windows_stats_cached(prs, windows):
+    watermark = read_watermark()
+    if not STATS_CACHE_FILE or not watermark:
+        return calc_windows_stats(prs, windows)
+
+    cache = dict()
+    if os.path.isfile(STATS_CACHE_FILE):
+        with open(STATS_CACHE_FILE, "r") as input_file:
+            cache = json.load(input_file)
+    entries = cache.get("entries", dict()) if cache.get("fingerprint") == stats_cache_fingerprint() else dict()
+
+    keys = [f"{w[0]}|{w[1]}" for w in windows]
+    entries = {key: entries[key] for key in keys if key in entries}
+
+    # Discard stats affected by PRs updated after they were calculated.
+    # All PRs are checked, including those not loaded, e.g. PRs moved to another branch.
+    if entries:
+        oldest = min(entry["watermark"] for entry in entries.values())
+        changed = load_prs(updated_since=oldest)
+        for key in list(entries.keys()):
+            begin_period, end_period = [int(x) for x in key.split("|")]
+            calculated_at = to_epoch(entries[key]["watermark"])
+            for i in range(len(changed)):
+                if changed.updated[i] <= calculated_at:
+                    continue
+                pr_end = get_pr_end_date(changed, i, end_period)
+                if changed.created[i] <= end_period and pr_end >= begin_period:
+                    del entries[key]
+                    break
+
+    missing = [w for w, key in zip(windows, keys) if key not in entries]
+    for w, result in zip(missing, calc_windows_stats(prs, missing)):
+        entries[f"{w[0]}|{w[1]}"] = {"watermark": watermark, "stats": pr_stats_to_dict(result)}
+
+    # Stats of the current range, ending now, are not reusable
+    now = int(datetime.datetime.now(datetime.timezone.utc).timestamp())
+    cache = {"fingerprint": stats_cache_fingerprint(), "entries": dict()}
+    for w, key in zip(windows, keys):
+        if w[1] < now:
+            cache["entries"][key] = entries[key]
+    with open(STATS_CACHE_FILE, "w") as output_file:
+        json.dump(cache, output_file)
+
+    return [dict_to_pr_stats(entries[key]["stats"]) for key in keys]
+
+
+# Date ranges used by the charts, covering the last HISTORY_DAYS days, sorted from the most recent.
+# Granularity, see WINDOW_GRANULARITY:
+# - "rolling": 7 days ranges ending now, e.g. 7 days ago => now, 14 days ago => 7 days ago, etc.
+# - "day", "week" (ISO weeks, starting on Monday), "month": ranges aligned to the calendar, in UTC.
+#   Only the first range, from the beginning of the current day/week/month to now, changes
+#   between runs, so the stats of the other ranges can be reused, see STATS_CACHE_FILE.
+def get_windows(now):
+    now = now.replace(microsecond=0)
+    if WINDOW_GRANULARITY == "rolling":
+        return [(now - relativedelta(days=(i + 7)), now - relativedelta(days=i)) for i in range(0, HISTORY_DAYS, 7)]
+
+    today = now.replace(hour=0, minute=0, second=0)
+    if WINDOW_GRANULARITY == "day":
+        start = today
+        step = relativedelta(days=1)
+    elif WINDOW_GRANULARITY == "week":
+        start = today - relativedelta(days=today.weekday())
+        step = relativedelta(weeks=1)
+    elif WINDOW_GRANULARITY == "month":
+        start = today.replace(day=1)
+        step = relativedelta(months=1)
+    else:
+        raise ValueError(f"Unknown WINDOW_GRANULARITY '{WINDOW_GRANULARITY}'")
+
+    oldest = now - relativedelta(days=HISTORY_DAYS)
+    windows = [(start, now)]
+    while start > oldest:
+        windows.append((start - step, start))
+        start = start - step
+    return windows
+
+
+# Date ranges used by the charts, see get_windows(). Returns the keys used by calc_draw_stats(),
+# e.g. "2024-01-01T00:00:00Z|2024-01-08T00:00:00Z", and the ranges as (begin, end) epoch seconds.
+def get_chart_windows(now):
+    keys = []
+    windows = []
+    for date_from, date_to in get_windows(now):
         key = f"{date_from.strftime('%Y-%m-%dT%H:%M:%SZ')}|{date_to.strftime('%Y-%m-%dT%H:%M:%SZ')}"
-        stats.period[key] = calc_pr_stats(
-            date_from.strftime("%Y-%m-%dT%H:%M:%SZ"), date_to.strftime("%Y-%m-%dT%H:%M:%SZ")
+        keys.append(key)
+        windows.append(
+            (to_epoch(date_from.strftime("%Y-%m-%dT%H:%M:%SZ")), to_epoch(date_to.strftime("%Y-%m-%dT%H:%M:%SZ")))
         )
+    return keys, windows
+
+
+# Label of a chart date range, key as returned by get_chart_windows(): the last day of rolling ranges,
+# the first day of ranges aligned to the calendar, e.g. "2024-09-01" for September.
+def window_label(key):
+    begin, end = key.split("|")
+    return (end if WINDOW_GRANULARITY == "rolling" else begin).split("T")[0]
+
+
+# Period covered by the charts, used in the report headings, e.g. "last 4 months", "last 6 weeks"
+def history_label():
+    for days, unit in [(30, "month"), (7, "week"), (1, "day")]:
+        if HISTORY_DAYS % days == 0:
+            count = HISTORY_DAYS // days
+            return f"last {count} {unit}" if count == 1 else f"last {count} {unit}s"
+
+
+# Calculate the stats of each chart date range, covering the last HISTORY_DAYS days (see get_windows)
+@timed
+def calc_draw_stats(prs, now=None):
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    keys, windows = get_chart_windows(now)
+
+    # Weeks are listed from the most recent, while calc_windows_stats() needs them in ascending order
+    results = calc_windows_stats_cached(prs, windows[::-1])[::-1]
+
+    stats = lambda: None
+    stats.period = dict()
+    for key, result in zip(keys, results):
+        stats.period[key] = result
     return stats
 
 
+# Dataset of a line chart, with the Chart.js options used by quickchart.io.
+# `style` contains more Chart.js options, e.g. "pointRadius:1,"
+def chart_dataset(label, values, border, background, fill=True, tension=0.2, style=""):
+    return {
+        "label": label,
+        "data": values,
+        "border": border,
+        "background": background,
+        "fill": fill,
+        "options": f"{style}lineTension:{tension},fill:{'true' if fill else 'false'},"
+        + f"borderColor:'{border}',backgroundColor:'{background}'",
+    }
+
+
+# Print a line chart: a quickchart.io URL, or an SVG file saved in CHARTS_DIR, see CHARTS in config.py
+def print_chart(labels, datasets):
+    if CHARTS == "svg":
+        file_name = save_chart(render_svg(labels, datasets), CHARTS_DIR)
+        print(f"![stats]({CHARTS_URL or CHARTS_DIR + '/'}{file_name})")
+        return
+
+    graph = (
+        "{type:'line',data:{labels:['"
+        + "','".join(labels)
+        + "'],datasets:["
+        + ",".join(f"{{label:'{d['label']}',data:[{','.join(d['data'])}],{d['options']}}}" for d in datasets)
+        + "]}}"
+    )
+    print(f"![stats](https://quickchart.io/chart?c={urllib.parse.quote(graph)})")
+
+
+@timed
 def draw_avg_to_close_stats(data):
-    print("## Avg time to close a PR, last 4 months\n")
+    print(f"## Avg time to close a PR, {history_label()}\n")
     print("Stats about the PRs that have been merged or closed.\n")
     labels = []
     values1 = []
     for key in data.period.keys():
         stats = data.period[key]
-        parts = key.split("|")
-        label = parts[1].split("T")[0]
-        labels.insert(0, label)
+        labels.insert(0, window_label(key))
 
-        value = (stats.int_avg_days_to_close + stats.ext_avg_days_to_close) / 2
+        # Average of all the PRs closed, internal and external
+        closed = stats.int_closed_count + stats.ext_closed_count
+        total = (
+            stats.int_avg_days_to_close * stats.int_closed_count + stats.ext_avg_days_to_close * stats.ext_closed_count
+        )
+        value = total / closed if closed else 0
         values1.insert(0, f"{value:.2f}")
 
-    graph = (
-        "{type:'line',data:{labels:['"
-        + "','".join(labels)
-        + "'],datasets:[{label:'days',data:["
-        + ",".join(values1)
-        + "],lineTension:0.2,fill:true,borderColor:'#003366',backgroundColor:'#FFCC00'}]}}"
+    print_chart(labels, [chart_dataset("days", values1, "#003366", "#FFCC00")])
+
+
+@timed
+def draw_days_to_close_percentiles(data):
+    print(f"## Days to close a PR, percentiles, {history_label()}\n")
+    print("Half of the PRs are closed within p50 days, 90% within p90 days, 99% within p99 days.\n")
+    labels = []
+    values1 = []
+    values2 = []
+    values3 = []
+    for key in data.period.keys():
+        stats = data.period[key]
+        labels.insert(0, window_label(key))
+
+        hist = merge_histograms(stats.int_days_to_close_hist, stats.ext_days_to_close_hist)
+        values1.insert(0, f"{percentile(hist, 50)}")
+        values2.insert(0, f"{percentile(hist, 90)}")
+        values3.insert(0, f"{percentile(hist, 99)}")
+
+    print_chart(
+        labels,
+        [
+            chart_dataset("p50", values1, "#003366", "#003366", fill=False),
+            chart_dataset("p90", values2, "#FF8C00", "#FF8C00", fill=False),
+            chart_dataset("p99", values3, "#B22222", "#B22222", fill=False),
+        ],
     )
-    print(f"![stats](https://quickchart.io/chart?c={urllib.parse.quote(graph)})")
 
 
+@timed
 def draw_avg_open_stats(data):
-    print("## Avg time a PR stays open, last 4 months\n")
+    print(f"## Avg time a PR stays open, {history_label()}\n")
     print("Stats about all the PRs, merged, closed and still open.\n")
     labels = []
     values1 = []
     for key in data.period.keys():
         stats = data.period[key]
-        parts = key.split("|")
-        label = parts[1].split("T")[0]
-        labels.insert(0, label)
+        labels.insert(0, window_label(key))
 
-        value = (stats.int_avg_open_days + stats.ext_avg_open_days) / 2
+        # Average of all the PRs, internal and external
+        count = stats.int_count + stats.ext_count
+        total = stats.int_avg_open_days * stats.int_count + stats.ext_avg_open_days * stats.ext_count
+        value = total / count if count else 0
         values1.insert(0, f"{value:.2f}")
 
-    graph = (
-        "{type:'line',data:{labels:['"
-        + "','".join(labels)
-        + "'],datasets:[{label:'days',data:["
-        + ",".join(values1)
-        + "],lineTension:0.2,fill:true,borderColor:'#003366',backgroundColor:'#FFCC00'}]}}"
-    )
-    print(f"![stats](https://quickchart.io/chart?c={urllib.parse.quote(graph)})")
+    print_chart(labels, [chart_dataset("days", values1, "#003366", "#FFCC00")])
 
 
+@timed
 def draw_prs_out_of_sla(data):
-    print("## PRs open more than 5 days, last 4 months\n")
+    print(f"## PRs open more than 5 days, {history_label()}\n")
     labels = []
     values1 = []
     for key in data.period.keys():
         stats = data.period[key]
-        parts = key.split("|")
-        label = parts[1].split("T")[0]
-        labels.insert(0, label)
+        labels.insert(0, window_label(key))
 
         value = stats.int_open_by_days["5+"] + stats.ext_open_by_days["5+"]
         values1.insert(0, f"{value:.2f}")
 
-    graph = (
-        "{type:'line',data:{labels:['"
-        + "','".join(labels)
-        + "'],datasets:["
-        + "{label:'open PRs',data:["
-        + (",".join(values1))
-        + "],lineTension:0.2,fill:true,borderColor:'#003366',backgroundColor:'#FFCC00'}"
-        + "]}}"
-    )
-    print(f"![stats](https://quickchart.io/chart?c={urllib.parse.quote(graph)})")
+    print_chart(labels, [chart_dataset("open PRs", values1, "#003366", "#FFCC00")])
 
 
+@timed
 def draw_int_ext_stats(data):
-    print("## Internal and External PRs %, last 4 months\n")
+    print(f"## Internal and External PRs %, {history_label()}\n")
     labels = []
     values1 = []
     values2 = []
     for key in data.period.keys():
         stats = data.period[key]
-        parts = key.split("|")
-        label = parts[1].split("T")[0]
-        labels.insert(0, label)
+        labels.insert(0, window_label(key))
 
         total = stats.int_count + stats.ext_count
         if total > 0:
@@ -395,48 +1354,35 @@ def draw_int_ext_stats(data):
             values1.insert(0, f"0")
             values2.insert(0, f"0")
 
-    graph = (
-        "{type:'line',data:{labels:['"
-        + "','".join(labels)
-        + "'],datasets:["
-        + "{label:'% internal',data:["
-        + (",".join(values1))
-        + "],lineTension:0.4,fill:false,borderColor:'#00539CFF',backgroundColor:'#00539CFF'},"
-        + "{label:'% external',data:["
-        + (",".join(values2))
-        + "],lineTension:0.4,fill:false,borderColor:'#97BC62FF',backgroundColor:'#97BC62FF'},"
-        + "]}}"
+    print_chart(
+        labels,
+        [
+            chart_dataset("% internal", values1, "#00539CFF", "#00539CFF", fill=False, tension=0.4),
+            chart_dataset("% external", values2, "#97BC62FF", "#97BC62FF", fill=False, tension=0.4),
+        ],
     )
-    print(f"![stats](https://quickchart.io/chart?c={urllib.parse.quote(graph)})")
 
 
+@timed
 def draw_open_close_stats(data):
-    print("## PRs open and closed, last 4 months\n")
+    print(f"## PRs open and closed, {history_label()}\n")
     labels = []
     values1 = []
     values2 = []
     for key in data.period.keys():
         stats = data.period[key]
-        parts = key.split("|")
-        label = parts[1].split("T")[0]
-        labels.insert(0, label)
+        labels.insert(0, window_label(key))
 
         values1.insert(0, f"{stats.int_count + stats.ext_count}")
         values2.insert(0, f"{stats.int_closed_count + stats.ext_closed_count}")
 
-    graph = (
-        "{type:'line',data:{labels:['"
-        + "','".join(labels)
-        + "'],datasets:["
-        + "{label:'open',data:["
-        + (",".join(values1))
-        + "],lineTension:0.2,fill:true,borderColor:'#FDD20EFF',backgroundColor:'#FDD20E99'},"
-        + "{label:'merged+closed',data:["
-        + (",".join(values2))
-        + "],lineTension:0.2,fill:true,borderColor:'#006400',backgroundColor:'#32CD32'},"
-        + "]}}"
+    print_chart(
+        labels,
+        [
+            chart_dataset("open", values1, "#FDD20EFF", "#FDD20E99"),
+            chart_dataset("merged+closed", values2, "#006400", "#32CD32"),
+        ],
     )
-    print(f"![stats](https://quickchart.io/chart?c={urllib.parse.quote(graph)})")
 
     labels = []
     values1 = []
@@ -445,41 +1391,32 @@ def draw_open_close_stats(data):
     total_closed = 0
     for key in data.period.keys():
         stats = data.period[key]
-        parts = key.split("|")
-        label = parts[1].split("T")[0]
-        labels.insert(0, label)
+        labels.insert(0, window_label(key))
 
         total_open = total_open + stats.int_count + stats.ext_count
         total_closed = total_closed + stats.int_closed_count + stats.ext_closed_count
         values1.append(f"{total_open}")
         values2.append(f"{total_closed}")
 
-    graph = (
-        "{type:'line',data:{labels:['"
-        + "','".join(labels)
-        + "'],datasets:["
-        + "{label:'open',data:["
-        + (",".join(values1))
-        + "],lineTension:0.2,fill:true,borderColor:'#FDD20EFF',backgroundColor:'#FDD20E99'},"
-        + "{label:'merged+closed',data:["
-        + (",".join(values2))
-        + "],lineTension:0.2,fill:true,borderColor:'#006400',backgroundColor:'#32CD32'},"
-        + "]}}"
+    print_chart(
+        labels,
+        [
+            chart_dataset("open", values1, "#FDD20EFF", "#FDD20E99"),
+            chart_dataset("merged+closed", values2, "#006400", "#32CD32"),
+        ],
     )
-    print(f"![stats](https://quickchart.io/chart?c={urllib.parse.quote(graph)})")
 
 
+@timed
 def draw_close_percentage_stats(data):
-    print("## % PR closed in <5 days | <10 days | <15 days, last 4 months\n")
+    print(f"## % PR closed in <5 days | <10 days | <15 days, {history_label()}\n")
     labels = []
     values1 = []
     values2 = []
     values3 = []
     for key in data.period.keys():
         stats = data.period[key]
-        parts = key.split("|")
-        label = parts[1].split("T")[0]
-        labels.insert(0, label)
+        labels.insert(0, window_label(key))
 
         lt_5days = stats.int_open_by_days["5-"] + stats.ext_open_by_days["5-"]
         lt_10days = stats.int_open_by_days["10-"] + stats.ext_open_by_days["10-"]
@@ -494,123 +1431,377 @@ def draw_close_percentage_stats(data):
             values2.insert(0, f"0")
             values3.insert(0, f"0")
 
-    graph = (
-        "{type:'line',data:{labels:['"
-        + "','".join(labels)
-        + "'],datasets:["
-        + "{label:'<5 days',data:["
-        + (",".join(values1))
-        + "],pointRadius:1,borderWidth:2,lineTension:0,fill:true,borderColor:'#4CAF50FF',backgroundColor:'#77DD77FF'},"
-        + "{label:'<10 days',data:["
-        + (",".join(values2))
-        + "],pointRadius:1,borderWidth:2,lineTension:0,fill:true,borderColor:'#99CC99FF',backgroundColor:'#CCFFCCFF'},"
-        + "{label:'<15 days',data:["
-        + (",".join(values3))
-        + "],pointRadius:1,borderWidth:2,lineTension:0,fill:true,borderColor:'#999999FF',backgroundColor:'#CCCCCC99'},"
-        + "]}}"
+    style = "pointRadius:1,borderWidth:2,"
+    print_chart(
+        labels,
+        [
+            chart_dataset("<5 days", values1, "#4CAF50FF", "#77DD77FF", tension=0, style=style),
+            chart_dataset("<10 days", values2, "#99CC99FF", "#CCFFCCFF", tension=0, style=style),
+            chart_dataset("<15 days", values3, "#999999FF", "#CCCCCC99", tension=0, style=style),
+        ],
     )
-    print(f"![stats](https://quickchart.io/chart?c={urllib.parse.quote(graph)})")
 
 
-# Show PRs out of 5, sorted by oldest first
-def print_slow_prs(days=10, external=True):
-    now = datetime.datetime.now(datetime.timezone.utc)
-    n_days_ago = now - relativedelta(days=days)
+# Find PRs open for more than `days` days, sorted by oldest first
+@timed
+def find_slow_prs(prs, days=10, external=True):
+    now = int(datetime.datetime.now(datetime.timezone.utc).timestamp())
     one_day = 3600 * 24
-    prs = read_csv()
-
-    title = f"\n## Internal PRs open for more than {days} days\n"
-    if external:
-        title = f"\n## External PRs open for more than {days} days\n"
-
-    for pr in prs.items():
-        pr = pr[1]
+    n_days_ago = now - days * one_day
 
+    result = []
+    for i in range(len(prs)):
         # Ignore drafts, PRs on branches other than main, PRs not open
         if (
-            pr["branch"] != MAIN_BRANCH
-            or pr["isDraft"] == "TRUE"
-            or pr["state"] != "OPEN"
-            or external != is_external_pr(pr)
+            prs.branch[i] != MAIN_BRANCH
+            or prs.is_draft[i]
+            or prs.state[i] != STATE_OPEN
+            or external != prs.is_external[i]
         ):
             continue
 
-        created_at = parse(pr["createdAt"])
-
         # Ignore PRs created less than n weeks ago
-        if created_at > n_days_ago:
+        if prs.created[i] > n_days_ago:
             continue
 
-        # Print title if first PR
-        if title:
-            print(title)
-            title = None
+        pr = pr_summary(prs, i)
+        pr["days_open"] = math.ceil(calc_open_time(prs, i, now) / one_day)
+        result.append(pr)
+
+    return result
+
+
+# Show PRs open for more than `days` days, found by find_slow_prs()
+def print_slow_prs(slow_prs, days=10, external=True):
+    if not slow_prs:
+        return
 
-        # Print PR details: title, url, days open
-        days_open = math.ceil(calc_open_time(pr) / one_day)
-        print(f"* [{days_open} days] #{pr['number']} - {pr['author']} - [{pr['title']}]({pr['url']})")
+    if external:
+        print(f"\n## External PRs open for more than {days} days\n")
+    else:
+        print(f"\n## Internal PRs open for more than {days} days\n")
 
+    # PR details: title, url, days open
+    for pr in slow_prs:
+        print(f"* [{pr['days_open']} days] #{pr['number']} - {pr['author']} - [{pr['title']}]({pr['url']})")
 
-# Show PRs without assignees
-def prs_without_assignees():
-    prs = read_csv()
-    title = f"## PRs without assignees\n"
-    for pr in prs.items():
-        pr = pr[1]
 
+# Find PRs without assignees
+@timed
+def prs_without_assignees(prs):
+    result = []
+    for i in range(len(prs)):
         # Ignore drafts, PRs on branches other than main, PRs not open
-        if pr["branch"] != MAIN_BRANCH or pr["isDraft"] == "TRUE" or pr["state"] != "OPEN":
+        if prs.branch[i] != MAIN_BRANCH or prs.is_draft[i] or prs.state[i] != STATE_OPEN:
             continue
 
-        if pr["assignees"] != "":
+        if prs.assignees[i] != "":
             continue
 
-        # Print title if first PR
-        if title:
-            print(title)
-            title = None
+        result.append(pr_summary(prs, i))
 
+    return result
+
+
+# Show PRs without assignees, found by prs_without_assignees()
+def print_prs_without_assignees(unassigned):
+    if not unassigned:
+        return
+
+    print(f"## PRs without assignees\n")
+    for pr in unassigned:
         print(f"* #{pr['number']} - {pr['author']} - [{pr['title']}]({pr['url']})")
 
 
-def gen_report():
-    print("# Semantic Kernel PR stats\n")
+# PR details listed in the report
+def pr_summary(prs, i):
+    return {"number": prs.number[i], "author": prs.author[i], "title": prs.title[i], "url": prs.url[i]}
+
+
+# Tasks run by run_parallel(), shared with the worker processes when they are forked
+parallel_tasks = []
+
+
+# Run a task in a worker process. Returns the result, and the timings recorded, see timing.py
+def run_parallel_task(i):
+    func, args = parallel_tasks[i]
+    first = len(timing.calls)
+    return func(*args), timing.calls[first:]
+
+
+# Run independent tasks, given as (function, args) tuples, and return their results in the same order.
+# With REPORT_WORKERS > 1 the tasks run in forked processes: the arguments, e.g. the PR table, are
+# shared with the workers without copying them, only the results are sent back and must be picklable.
+# Tasks run one after the other if fork is not available, or with other threads running, e.g. in
+# the daemon, because forking a process with threads is unsafe.
+def run_parallel(tasks):
+    global parallel_tasks
+    if (
+        REPORT_WORKERS <= 1
+        or len(tasks) < 2
+        or threading.active_count() > 1
+        or "fork" not in multiprocessing.get_all_start_methods()
+    ):
+        return [func(*args) for func, args in tasks]
+
+    parallel_tasks = tasks
+    try:
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(min(REPORT_WORKERS, len(tasks)), mp_context=context) as pool:
+            results = list(pool.map(run_parallel_task, range(len(tasks))))
+    finally:
+        parallel_tasks = []
+
+    for result, calls in results:
+        timing.calls += calls
+    return [result for result, calls in results]
+
+
+# Stats of the last `weeks` weeks, as a dict, see run_parallel()
+def calc_summary_task(prs, now, weeks):
+    n_weeks_ago = now - relativedelta(weeks=weeks)
+    result = calc_pr_stats(prs, n_weeks_ago.strftime("%Y-%m-%dT%H:%M:%SZ"), now.strftime("%Y-%m-%dT%H:%M:%SZ"))
+    return pr_stats_to_dict(result)
+
+
+# Stats of each chart date range, as dicts, see run_parallel()
+def calc_draw_stats_task(prs, now):
+    return {key: pr_stats_to_dict(result) for key, result in calc_draw_stats(prs, now).period.items()}
+
+
+# PR lifecycle, only when the PR timelines are downloaded, see timeline.py
+def calc_timeline_task(prs, now):
+    # Imported only when used, timeline.py depends on this module
+    from timeline import calc_timeline_stats
+
+    return calc_timeline_stats(prs, get_chart_windows(now)[0], now)
+
+
+# Top labels and authors, read from the cube, see cube.py
+def calc_top_values_task():
+    # Imported only when used, cube.py depends on this module
+    from cube import read_cube, top_values
 
+    cube = read_cube()
+    if cube is None:
+        return None
+    return {dimension: top_values(cube, dimension, count=CUBE_TOP) for dimension in ["label", "author"]}
+
+
+# Weeks covered by the summary tables
+SUMMARY_WEEKS = [2, 4, 8]
+
+
+# Oldest date used by the report: the charts (see HISTORY_DAYS) or the summary tables, whichever is older.
+# PRs merged or closed before this date are not needed.
+def get_report_since(now):
+    oldest = min(get_windows(now)[-1][0], now.replace(microsecond=0) - relativedelta(weeks=max(SUMMARY_WEEKS)))
+    return oldest.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+# Calculate all the stats shown in the report, without printing them. The report is rendered
+# from this model, as markdown with print_report(), or saved as JSON and Parquet files.
+@timed
+def build_report(title="Semantic Kernel"):
     now = datetime.datetime.now(datetime.timezone.utc)
-    print("Last update: " + now.strftime("%Y-%m-%d %H:%M:%S %Z") + "\n")
 
+    # Load the PRs once, all the stats below use the same data: only PRs
+    # on the main branch, not drafts, and active since the oldest date used by the report
+    prs = load_prs(MAIN_BRANCH, False, get_report_since(now))
+
+    return build_report_model(title, now, prs)
+
+
+# Calculate the report stats. The stats of each chart date range are calculated with calc_draw_stats(),
+# unless given, e.g. by the daemon. Independent stats are calculated in parallel, see REPORT_WORKERS.
+@timed
+def build_report_model(title, now, prs, charts=None):
+    report = lambda: None
+    report.title = title
+    report.now = now
+    report.slow_days = 10
+
+    tasks = dict()
+    if charts is None:
+        tasks["charts"] = (calc_draw_stats_task, (prs, now))
+    # Stats of the last 2, 4 and 8 weeks
+    for weeks in SUMMARY_WEEKS:
+        tasks[weeks] = (calc_summary_task, (prs, now, weeks))
+    tasks["external"] = (find_slow_prs, (prs, report.slow_days, True))
+    tasks["internal"] = (find_slow_prs, (prs, report.slow_days, False))
+    tasks["unassigned"] = (prs_without_assignees, (prs,))
+    if TIMELINE_FILE:
+        tasks["timeline"] = (calc_timeline_task, (prs, now))
+    if CUBE_FILE:
+        tasks["top"] = (calc_top_values_task, ())
+
+    results = dict(zip(tasks.keys(), run_parallel(list(tasks.values()))))
+
+    report.summary = {weeks: dict_to_pr_stats(results[weeks]) for weeks in SUMMARY_WEEKS}
+
+    # Stats of each chart date range
+    if charts is None:
+        charts = lambda: None
+        charts.period = {key: dict_to_pr_stats(values) for key, values in results["charts"].items()}
+    report.charts = charts
+
+    report.slow_prs = {"external": results["external"], "internal": results["internal"]}
+    report.unassigned = results["unassigned"]
+    report.timeline = results.get("timeline")
+    report.top = results.get("top")
+
+    return report
+
+
+# Convert a report model to a dict, e.g. to save it in a JSON file
+def report_to_dict(report):
+    return {
+        "title": report.title,
+        "updated": report.now.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "summary": {f"{weeks} weeks": pr_stats_to_dict(s) for weeks, s in report.summary.items()},
+        "windows": [
+            {"begin": key.split("|")[0], "end": key.split("|")[1], **pr_stats_to_dict(s)}
+            for key, s in report.charts.period.items()
+        ],
+        "slow_prs": report.slow_prs,
+        "unassigned": report.unassigned,
+        "timeline": report.timeline,
+        "top": report.top,
+    }
+
+
+# Save the stats of each chart date range as a Parquet table, one row per date range.
+# Nested counters are flattened, e.g. int_open_by_days["5+"] is saved in the "int_open_by_days_5+" column.
+def save_report_parquet(report, file_name):
+    try:
+        import pyarrow, pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("STATS_PARQUET_FILE requires pyarrow, install it with: pip install pyarrow")
+
+    rows = []
+    for window in report_to_dict(report)["windows"]:
+        row = dict()
+        for name, value in window.items():
+            # Histograms are saved as percentiles, e.g. "int_days_to_close_p90"
+            if name.endswith("_hist"):
+                for p in [50, 90, 99]:
+                    row[f"{name[:-5]}_p{p}"] = percentile(value, p)
+            elif isinstance(value, dict):
+                for key, count in value.items():
+                    row[f"{name}_{key}"] = count
+            else:
+                row[name] = value
+        rows.append(row)
+
+    pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows), file_name)
+
+
+# Save the report model in STATS_JSON_FILE and STATS_PARQUET_FILE, when set in config.py
+@timed
+def save_report(report):
+    if STATS_JSON_FILE:
+        with open(STATS_JSON_FILE, "w") as output_file:
+            json.dump(report_to_dict(report), output_file, indent=2)
+    if STATS_PARQUET_FILE:
+        save_report_parquet(report, STATS_PARQUET_FILE)
+
+
+# Report title and time of the last update
+def print_header(report):
+    print(f"# {report.title} PR stats\n")
+    print("Last update: " + report.now.strftime("%Y-%m-%d %H:%M:%S %Z") + "\n")
+
+
+# Stats of the last 2, 4 and 8 weeks, side by side
+def print_summary(summary):
     print("## PR summary\n")
     print("<table><tr><td>\n")
-    print_stats2(weeks=2, with_header=True)
+    print_stats2(summary[2], weeks=2, with_header=True)
     print("\n</td><td>\n")
-    print_stats2(weeks=4, with_header=False)
+    print_stats2(summary[4], weeks=4, with_header=False)
     print("\n</td><td>\n")
-    print_stats2(weeks=8, with_header=False)
+    print_stats2(summary[8], weeks=8, with_header=False)
     print("\n</td></tr></table>\n")
 
-    stats = calc_draw_stats()
 
-    # How many PRs are open more than 5 days
-    draw_prs_out_of_sla(stats)
+# PRs waiting for too long, and PRs without assignees
+def print_pr_lists(report):
+    print_slow_prs(report.slow_prs["external"], days=report.slow_days, external=True)
+    print_slow_prs(report.slow_prs["internal"], days=report.slow_days, external=False)
+    print("\n")
+
+    print_prs_without_assignees(report.unassigned)
+    print("\n")
 
-    # How long does it take to close a PR
-    draw_avg_to_close_stats(stats)
 
-    # How long do PRs stay open
-    draw_avg_open_stats(stats)
+# Sections of the report, in order, as (function printing the section, args) tuples
+def report_sections(report):
+    sections = [(print_header, (report,)), (print_summary, (report.summary,))]
 
-    # How many PRs are closed and how many are open
-    draw_open_close_stats(stats)
+    # Bots and former team members, only when the author categories are configured
+    if AUTHORS_FILE or ORG_MEMBERS_FILE:
+        sections.append((print_category_stats, (report.summary[4], 4)))
 
-    # % of PRs closed in <5 days | <10 days | <15 days
-    draw_close_percentage_stats(stats)
+    sections += [
+        # How many PRs are open more than 5 days
+        (draw_prs_out_of_sla, (report.charts,)),
+        # How long does it take to close a PR
+        (draw_avg_to_close_stats, (report.charts,)),
+        (draw_days_to_close_percentiles, (report.charts,)),
+        # How long do PRs stay open
+        (draw_avg_open_stats, (report.charts,)),
+        # How many PRs are closed and how many are open
+        (draw_open_close_stats, (report.charts,)),
+        # % of PRs closed in <5 days | <10 days | <15 days
+        (draw_close_percentage_stats, (report.charts,)),
+        # Internal vs External %
+        (draw_int_ext_stats, (report.charts,)),
+    ]
 
-    # Internal vs External %
-    draw_int_ext_stats(stats)
+    # Time to first review, time waiting for reviewers/authors
+    if report.timeline is not None:
+        from timeline import print_timeline_stats
 
-    print_slow_prs(days=10, external=True)
-    print_slow_prs(days=10, external=False)
-    print("\n")
+        sections.append((print_timeline_stats, (report.timeline,)))
 
-    prs_without_assignees()
-    print("\n")
+    # Top labels and authors, only when the cube is created, see CUBE_FILE
+    if report.top is not None:
+        from cube import print_top_values
+
+        for dimension, top in report.top.items():
+            sections.append((print_top_values, (dimension, top)))
+
+    sections.append((print_pr_lists, (report,)))
+    return sections
+
+
+# Render a section of the report, returning the text printed by the section function
+def render_section(func, args):
+    with io.StringIO() as buffer:
+        with contextlib.redirect_stdout(buffer):
+            func(*args)
+        return buffer.getvalue()
+
+
+# Print the report as markdown. Sections are rendered in parallel, see REPORT_WORKERS,
+# and printed in order, so the report is the same regardless of the number of workers.
+@timed
+def print_report(report):
+    text = "".join(run_parallel([(render_section, section) for section in report_sections(report)]))
+    print(text, end="")
+
+    # Delete the charts of the previous reports
+    if CHARTS == "svg":
+        prune_charts(CHARTS_DIR, text)
+
+
+@timed
+def gen_report(title="Semantic Kernel"):
+    report = build_report(title)
+    save_report(report)
+    print_report(report)
+
+    if SHOW_TIMINGS:
+        print_timings()
+
+    return report
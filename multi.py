@@ -0,0 +1,114 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+import config
+import lib, fetch, pipeline, timeline, cube
+from charts import publish_report
+import os, sys, datetime, contextlib, json, traceback
+from concurrent.futures import ProcessPoolExecutor
+
+# Repositories to process, e.g.
+# REPOS = [{"name": "microsoft/semantic-kernel", "dir": "repos/sk", "main_branch": "main", "team_members": ["dluc"]}]
+REPOS = getattr(config, "REPOS", [])
+MAX_WORKERS = getattr(config, "MAX_WORKERS", 4)
+
+# Last 4 weeks stats of a repository, saved in the repository dir with the report, and used for the
+# summary when the report is skipped
+SUMMARY_STATS_FILE = "summary-stats.json"
+
+
+# Download the PRs of a repository, update its CSV file and generate its report.
+# Each repository uses its own directory for prs.json, prs.csv, report.md, etc.
+# Runs in a worker process, returns the last 4 weeks stats of the report for the summary.
+def process_repo(repo):
+    os.makedirs(repo["dir"], exist_ok=True)
+    os.chdir(repo["dir"])
+
+    # `gh` commands use GH_REPO instead of the repository cloned in REPO_DIR
+    os.environ["GH_REPO"] = repo["name"]
+    fetch.REPO_DIR = "."
+    lib.use_repo(repo)
+
+    sync_mode = os.environ.get("SYNC_MODE")
+    if sync_mode == "incremental":
+        fetch.download_json_incremental()
+    elif sync_mode != "async":
+        fetch.download_json()
+    # else: PRs already downloaded by run_all()
+
+    # Stages are skipped when their inputs didn't change, see pipeline.py
+    if pipeline.is_changed("csv"):
+        lib.update_csv()
+        timeline.update_timelines()
+        cube.update_cube()
+        pipeline.save_fingerprint("csv")
+
+    if pipeline.is_changed("report", [repo["name"]]) or not os.path.isfile(SUMMARY_STATS_FILE):
+        with open("report.md", "w") as report_file:
+            with contextlib.redirect_stdout(report_file):
+                report = lib.gen_report(title=repo["name"])
+        with open(SUMMARY_STATS_FILE, "w") as output_file:
+            json.dump(lib.pr_stats_to_dict(report.summary[4]), output_file)
+        pipeline.save_fingerprint("report", [repo["name"]])
+
+    if repo.get("gist") and pipeline.is_changed("upload", [repo["gist"]]):
+        publish_report(repo["gist"], "report.md", lib.CHARTS_DIR, fetch.GH_CLI)
+        pipeline.save_fingerprint("upload", [repo["gist"]])
+
+    # Stats for the summary, returned as a dict to be sent back to the main process
+    with open(SUMMARY_STATS_FILE, "r") as input_file:
+        return json.load(input_file)
+
+
+# Run process_repo() and catch errors, so one repository doesn't stop the others.
+# Repositories that failed to download are skipped.
+def try_process_repo(repo, download_error=None):
+    if download_error:
+        return None, download_error
+
+    base_dir = os.getcwd()
+    try:
+        return process_repo(repo), None
+    except Exception:
+        return None, traceback.format_exc()
+    finally:
+        os.chdir(base_dir)
+
+
+# Process all the repositories in REPOS, MAX_WORKERS at a time, then print a summary table
+def run_all():
+    # Async mode: download all the repositories at once, before processing them
+    download_errors = [None] * len(REPOS)
+    if os.environ.get("SYNC_MODE") == "async":
+        # Imported only when used, aiohttp is optional
+        from fetch_async import download_repos_async
+
+        download_errors = download_repos_async(REPOS)
+
+    with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = list(executor.map(try_process_repo, REPOS, download_errors))
+
+    print("# PR stats summary\n")
+    now = datetime.datetime.now(datetime.timezone.utc)
+    print("Last update: " + now.strftime("%Y-%m-%d %H:%M:%S %Z") + "\n")
+    print("## Last 4 weeks\n")
+    print("Repo | Open (int) | Open (ext) | Closed | Avg days to close | Avg days open | open >5 days")
+    print("---- | ---------- | ---------- | ------ | ----------------- | ------------- | ------------")
+
+    for repo, (s, error) in zip(REPOS, results):
+        if error:
+            print(f"{repo['name']} | error | | | | | |")
+            print(f"Error processing {repo['name']}:\n{error}", file=sys.stderr)
+            continue
+
+        count = s["int_count"] + s["ext_count"]
+        closed = s["int_closed_count"] + s["ext_closed_count"]
+        days_to_close = s["int_avg_days_to_close"] * s["int_closed_count"]
+        days_to_close += s["ext_avg_days_to_close"] * s["ext_closed_count"]
+        days_open = s["int_avg_open_days"] * s["int_count"] + s["ext_avg_open_days"] * s["ext_count"]
+        open_5_days = s["int_open_by_days"]["5+"] + s["ext_open_by_days"]["5+"]
+        print(
+            f"{repo['name']} | {s['int_count']} | {s['ext_count']} | {closed}"
+            + f" | {days_to_close / closed if closed else 0:.1f}"
+            + f" | {days_open / count if count else 0:.1f}"
+            + f" | {open_5_days}"
+        )
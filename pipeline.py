@@ -0,0 +1,105 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+# Skip the pipeline stages when their inputs didn't change since the last run.
+# Each stage has a fingerprint, a hash of its inputs, saved in PIPELINE_STATE_FILE after the stage completes.
+#
+# Usage, see run.sh:
+#   python pipeline.py changed <stage> [values]   exit code 0 if the stage must run, 3 if the inputs didn't change
+#   python pipeline.py save <stage> [values]      save the fingerprint, after the stage completed
+#
+# Stages:
+#   csv     inputs: the PRs downloaded (JSON_FILE), config
+#   report  inputs: the PRs stored (CSV_FILE or DB_FILE), config, code, time (see REPORT_MAX_AGE)
+#   upload  inputs: report.md, charts
+# Optional values, e.g. the gist ID, are added to the fingerprint. Set FORCE=1 in the environment to run all the stages.
+
+import config
+import lib
+import glob, hashlib, json, os, sys, time
+
+# Optional settings, using defaults if missing in config.py
+PIPELINE_STATE_FILE = getattr(config, "PIPELINE_STATE_FILE", "pipeline-state.json")
+REPORT_MAX_AGE = getattr(config, "REPORT_MAX_AGE", 60)
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Exit code of `pipeline.py changed` when the inputs didn't change. Python exits with 1 on errors,
+# so errors are not mistaken for "not changed", and run.sh runs the stage anyway.
+EXIT_UNCHANGED = 3
+
+
+# Add the content of some files to a hash, missing files are skipped
+def hash_files(fingerprint, file_names):
+    for file_name in file_names:
+        fingerprint.update(file_name.encode("utf-8"))
+        if os.path.isfile(file_name):
+            with open(file_name, "rb") as input_file:
+                for chunk in iter(lambda: input_file.read(1 << 20), b""):
+                    fingerprint.update(chunk)
+
+
+# Calculate the fingerprint of a stage, see the comments at the top of the file
+def stage_fingerprint(stage, values=()):
+    fingerprint = hashlib.sha256(json.dumps([stage, list(values)]).encode("utf-8"))
+
+    if stage == "csv":
+        hash_files(fingerprint, [config.__file__, lib.JSON_FILE])
+    elif stage == "report":
+        # The report shows the time of the last update, and some stats depend on the current
+        # time: regenerate the report every REPORT_MAX_AGE minutes, even if the PRs didn't change
+        bucket = int(time.time() // (REPORT_MAX_AGE * 60)) if REPORT_MAX_AGE > 0 else time.time()
+        stored = lib.DB_FILE if lib.STORAGE == "sqlite" else lib.CSV_FILE
+        fingerprint.update(f"{bucket}|{lib.stats_cache_fingerprint()}".encode("utf-8"))
+        hash_files(fingerprint, [config.__file__, stored] + sorted(glob.glob(os.path.join(CODE_DIR, "*.py"))))
+    elif stage == "upload":
+        # Charts are named after their content, the file names are enough
+        charts = sorted(os.listdir(lib.CHARTS_DIR)) if os.path.isdir(lib.CHARTS_DIR) else []
+        fingerprint.update(json.dumps(charts).encode("utf-8"))
+        hash_files(fingerprint, ["report.md"])
+    else:
+        raise ValueError(f"Unknown pipeline stage: {stage}")
+
+    return fingerprint.hexdigest()
+
+
+# Read the fingerprints saved by the previous runs. A corrupt file is ignored, so all the stages run.
+def read_state():
+    if not os.path.isfile(PIPELINE_STATE_FILE):
+        return dict()
+    try:
+        with open(PIPELINE_STATE_FILE, "r") as input_file:
+            state = json.load(input_file)
+    except ValueError:
+        print(f"Ignoring corrupt {PIPELINE_STATE_FILE}, all the stages will run", file=sys.stderr)
+        return dict()
+    return state if isinstance(state, dict) else dict()
+
+
+# Check if a stage must run: inputs changed since the last run, or FORCE set in the environment
+def is_changed(stage, values=()):
+    if os.environ.get("FORCE"):
+        return True
+    return read_state().get(stage) != stage_fingerprint(stage, values)
+
+
+# Save the fingerprint of a stage, after the stage completed
+def save_fingerprint(stage, values=()):
+    state = read_state()
+    state[stage] = stage_fingerprint(stage, values)
+    with open(PIPELINE_STATE_FILE, "w") as output_file:
+        json.dump(state, output_file, indent=2)
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ["changed", "save"]:
+        print(f"Usage: python {sys.argv[0]} changed|save <stage> [values]", file=sys.stderr)
+        sys.exit(2)
+
+    command, stage, values = sys.argv[1], sys.argv[2], sys.argv[3:]
+    if command == "changed":
+        sys.exit(0 if is_changed(stage, values) else EXIT_UNCHANGED)
+    save_fingerprint(stage, values)
+
+
+if __name__ == "__main__":
+    main()
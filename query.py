@@ -0,0 +1,209 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+# Ad-hoc queries over the PRs, using secondary indexes instead of scanning all the PRs for each question.
+#
+# Usage:
+#   python query.py --state open --branch main --no-drafts --label bug
+#   python query.py --assignee dluc --assignee alice --since 2024-01-01 --count
+#   python query.py --state open --unassigned --json
+#   python query.py --author dluc --since 2024-01-01 --until 2024-02-01 --sort created
+# Different options must all match, repeated options match any of the values, e.g. PRs
+# with label "bug" or "security". Dates are UTC, "YYYY-MM-DD" or "YYYY-MM-DDTHH:MM:SSZ".
+# With STORAGE = "sqlite" the options are converted to SQL conditions, and the database reads only
+# the PRs matching, using the table indexes. With the CSV file, PRs are filtered while reading the
+# file, converting only the PRs matching.
+#
+# From Python, e.g. to answer several questions about the same PRs, the PRs are indexed in memory
+# once, and filters are functions combined with all_of(), any_of() and not_():
+#   index = PrIndex(lib.load_prs())
+#   prs = index.find(all_of(equals("state", "OPEN"), any_of(equals("label", "bug"), equals("label", "security"))))
+
+import lib
+from storage import db_query, LIST_FIELDS
+import argparse, bisect, json, time
+
+# Columns with a secondary index. Labels and assignees are indexed one by one,
+# splitting the comma separated values, e.g. "bug,python" => "bug", "python".
+# PRs without labels/assignees are indexed with an empty value, e.g. equals("assignee", "").
+INDEXED_COLUMNS = ["state", "branch", "author", "label", "assignee", "draft"]
+
+
+# Indexes of a PrTable: for each value, the positions of the PRs with that value, in ascending order
+class PrIndex:
+    def __init__(self, prs):
+        self.prs = prs
+        self.values = {column: dict() for column in INDEXED_COLUMNS}
+        states = {code: name for name, code in lib.STATES.items()}
+        for i in range(len(prs)):
+            self.add("state", states[prs.state[i]], i)
+            self.add("branch", prs.branch[i], i)
+            self.add("author", prs.author[i], i)
+            self.add("draft", bool(prs.is_draft[i]), i)
+            for label in prs.labels[i].split(","):
+                self.add("label", label, i)
+            for assignee in prs.assignees[i].split(","):
+                self.add("assignee", assignee, i)
+
+        # PR positions sorted by creation date, for date range scans
+        self.by_created = sorted(range(len(prs)), key=lambda i: prs.created[i])
+        self.created = [prs.created[i] for i in self.by_created]
+
+    def add(self, column, value, i):
+        self.values[column].setdefault(value, []).append(i)
+
+    # Positions of the PRs with a value, e.g. lookup("label", "bug")
+    def lookup(self, column, value):
+        if column not in self.values:
+            raise ValueError(f"Column '{column}' is not indexed, indexed columns: {', '.join(INDEXED_COLUMNS)}")
+        return set(self.values[column].get(value, []))
+
+    # Positions of the PRs created in a date range, begin included, end excluded (epoch seconds, None: no limit)
+    def created_between(self, begin=None, end=None):
+        first = bisect.bisect_left(self.created, begin) if begin is not None else 0
+        last = bisect.bisect_left(self.created, end) if end is not None else len(self.created)
+        return set(self.by_created[first:last])
+
+    # Positions of all the PRs
+    def all(self):
+        return set(range(len(self.prs)))
+
+    # PRs matching a filter, as a PrTable, sorted by PR number
+    def find(self, where):
+        found = lib.PrTable()
+        for i in sorted(where(self)):
+            found.add_from(self.prs, i)
+        return found
+
+    # Number of PRs matching a filter
+    def count(self, where):
+        return len(where(self))
+
+
+# Filter: PRs with a value in an indexed column, e.g. equals("assignee", "dluc")
+def equals(column, value):
+    return lambda index: index.lookup(column, value)
+
+
+# Filter: PRs created in a date range, dates as "YYYY-MM-DD" or "YYYY-MM-DDTHH:MM:SSZ", None: no limit
+def created_between(begin=None, end=None):
+    return lambda index: index.created_between(to_epoch(begin), to_epoch(end))
+
+
+# Filter: PRs matching all the filters. Results are intersected starting from the smallest.
+def all_of(*filters):
+    def match(index):
+        results = sorted((f(index) for f in filters), key=len)
+        return set.intersection(*results) if results else index.all()
+
+    return match
+
+
+# Filter: PRs matching any of the filters
+def any_of(*filters):
+    return lambda index: set().union(*(f(index) for f in filters))
+
+
+# Filter: PRs not matching the filter
+def not_(where):
+    return lambda index: index.all() - where(index)
+
+
+# Convert a date from the command line to epoch seconds, e.g. "2024-01-01" => 1704067200
+def to_epoch(date):
+    if date is None:
+        return None
+    if len(date) == 10:
+        date += "T00:00:00Z"
+    return lib.to_epoch(date)
+
+
+# Conditions combining the command line options, as (field, values) tuples, see storage.db_query()
+def args_to_match(args):
+    match = []
+    for field, values in [
+        ("state", [v.upper() for v in args.state]),
+        ("branch", args.branch),
+        ("author", args.author),
+        ("labels", args.label),
+        ("assignees", args.assignee),
+    ]:
+        if values:
+            match.append((field, values))
+    if args.no_drafts:
+        match.append(("isDraft", ["False"]))
+    if args.unassigned:
+        match.append(("assignees", [""]))
+    return match
+
+
+# Date from the command line in the format stored, e.g. "2024-01-01" => "2024-01-01T00:00:00Z", None: no limit
+def to_date(date):
+    if date is not None and len(date) == 10:
+        return date + "T00:00:00Z"
+    return date
+
+
+# Check if a row of the CSV file matches the conditions, same as storage.db_query()
+def row_matches(row, match, created_since=None, created_before=None):
+    for field, values in match:
+        found = row[field].split(",") if field in LIST_FIELDS else [row[field]]
+        if not any(value in found for value in values):
+            return False
+    if created_since is not None and row["createdAt"] < created_since:
+        return False
+    if created_before is not None and row["createdAt"] >= created_before:
+        return False
+    return True
+
+
+# Rows of the PRs matching the conditions, sorted by PR number, reading only those PRs from the database
+def find_rows(match, created_since=None, created_before=None):
+    if lib.STORAGE == "sqlite":
+        return list(db_query(lib.DB_FILE, lib.FIELDS, match, created_since, created_before))
+    return [row for row in lib.read_csv().values() if row_matches(row, match, created_since, created_before)]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find PRs, e.g. open PRs with a label, PRs of an author in a date range"
+    )
+    parser.add_argument("--state", action="append", default=[], help="OPEN, CLOSED or MERGED")
+    parser.add_argument("--branch", action="append", default=[], help="target branch")
+    parser.add_argument("--author", action="append", default=[], help="author login")
+    parser.add_argument("--label", action="append", default=[], help="label name")
+    parser.add_argument("--assignee", action="append", default=[], help="assignee login")
+    parser.add_argument("--unassigned", action="store_true", help="only PRs without assignees")
+    parser.add_argument("--no-drafts", action="store_true", help="exclude draft PRs")
+    parser.add_argument("--since", help="created on or after the date")
+    parser.add_argument("--until", help="created before the date")
+    parser.add_argument("--sort", choices=["number", "created"], default="number", help="sort order, default: number")
+    parser.add_argument("--count", action="store_true", help="print only the number of PRs found")
+    parser.add_argument("--json", action="store_true", help="print the PRs as JSON, one per line")
+    args = parser.parse_args()
+
+    rows = find_rows(args_to_match(args), to_date(args.since), to_date(args.until))
+    if args.count:
+        print(len(rows))
+        return
+
+    prs = lib.rows_to_prs(rows)
+    positions = range(len(prs))
+    if args.sort == "created":
+        positions = sorted(positions, key=lambda i: prs.created[i])
+
+    states = {code: name for name, code in lib.STATES.items()}
+    for i in positions:
+        if args.json:
+            pr = lib.pr_summary(prs, i)
+            pr["state"] = states[prs.state[i]]
+            pr["branch"] = prs.branch[i]
+            pr["created"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(prs.created[i]))
+            pr["labels"] = prs.labels[i]
+            pr["assignees"] = prs.assignees[i]
+            print(json.dumps(pr))
+        else:
+            print(f"* #{prs.number[i]} - {states[prs.state[i]]} - {prs.author[i]} - [{prs.title[i]}]({prs.url[i]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+#!/usr/bin/env bash
+# Author: Devis Lucato, https://github.com/dluc
+
+set -e
+
+PATH="$PATH:/snap/bin/"
+
+cd "$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/"
+
+source .env
+
+# Settings used by the Python scripts
+export SYNC_MODE GITHUB_TOKEN
+
+echo "Processing repos..." > last-run.log
+python -c "from multi import run_all; run_all()" > summary.md
+
+cat summary.md | gh gist edit $GIST summary.md
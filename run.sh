@@ -9,13 +9,51 @@ cd "$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/"
 
 source .env
 
-echo "Downloading PRs..." > last-run.log
+# Log each step with the current time, the log is reset at each run.
+# Timings of the Python functions are saved in run-log.jsonl
+log() {
+    echo "$(date -u '+%Y-%m-%d %H:%M:%S') $1" >> last-run.log
+}
+
+echo -n > last-run.log
+
+# Check if a stage must run, see pipeline.py: exit code 3 means the inputs didn't change.
+# If pipeline.py fails, e.g. with a bad config, the stage runs anyway.
+changed() {
+    local rc=0
+    python pipeline.py changed "$@" || rc=$?
+    if [ $rc -ne 0 ] && [ $rc -ne 3 ]; then
+        log "pipeline.py failed with exit code $rc, running the stage"
+    fi
+    [ $rc -ne 3 ]
+}
+
+log "Downloading PRs..."
 ./1-download-json.sh
 
-echo "JSON to CSVs..." > last-run.log
-./2-update-csv.sh
-
-echo "Gen report..." > last-run.log
-./3-gen-stats.sh
-
-cat report.md | gh gist edit $GIST report.md
+# The next stages are skipped when their inputs didn't change, see pipeline.py
+log "JSON to CSVs..."
+if changed csv; then
+    ./2-update-csv.sh
+    python pipeline.py save csv
+else
+    log "PRs not changed, skipped"
+fi
+
+log "Gen report..."
+if changed report; then
+    ./3-gen-stats.sh
+    python pipeline.py save report
+else
+    log "PRs not changed, skipped"
+fi
+
+log "Uploading report..."
+if changed upload "$GIST"; then
+    python -c "from lib import CHARTS_DIR; from charts import publish_report; publish_report('$GIST', 'report.md', CHARTS_DIR)"
+    python pipeline.py save upload "$GIST"
+else
+    log "Report not changed, skipped"
+fi
+
+log "Done"
@@ -0,0 +1,128 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+# Compact binary snapshot of the PR table, see SNAPSHOT_FILE in config.py.
+# The file is memory-mapped when loaded, so only the PRs used are read and decoded.
+#
+# File layout:
+#   MAGIC
+#   header size (8 bytes) + JSON header: PR count, size and time of the CSV file,
+#     position of each column, string tables
+#   columns, each aligned to 8 bytes:
+#   - integer columns, e.g. number, dates as epoch seconds
+#   - coded columns, e.g. author: int32 codes, index in the string table saved in the header
+#   - text columns, e.g. title: int64 offsets (count + 1) and UTF-8 text
+# Numbers use the byte order of the machine writing the file: the snapshot is a local cache,
+# recreated from the CSV file when missing or older than the CSV file.
+
+import json, mmap, os, struct
+from array import array
+
+MAGIC = b"PRSNAP01"
+
+
+# Size and modification time of the file the snapshot was created from, to detect changes
+def source_stamp(source_file):
+    stat = os.stat(source_file)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+# Check if the snapshot exists and was created from the current version of the source file
+def is_snapshot_current(file_name, source_file):
+    if not os.path.isfile(file_name) or not os.path.isfile(source_file):
+        return False
+    with open(file_name, "rb") as input_file:
+        if input_file.read(len(MAGIC)) != MAGIC:
+            return False
+        header_size = struct.unpack("<Q", input_file.read(8))[0]
+        header = json.loads(input_file.read(header_size))
+    return header["source"] == source_stamp(source_file)
+
+
+# Save a snapshot. Columns are given as:
+# - int_columns: dict of arrays, e.g. {"number": array("q", ...)}
+# - coded_columns: dict of lists of strings with few distinct values, e.g. authors
+# - text_columns: dict of lists of strings, e.g. titles
+def write_snapshot(file_name, source_file, count, int_columns, coded_columns, text_columns):
+    blobs = []
+    header = {"count": count, "source": source_stamp(source_file), "columns": dict(), "tables": dict()}
+
+    for name, values in int_columns.items():
+        blobs.append((name, values.typecode, values.tobytes()))
+
+    for name, values in coded_columns.items():
+        table = dict()
+        codes = array("i", (table.setdefault(value, len(table)) for value in values))
+        header["tables"][name] = list(table.keys())
+        blobs.append((name, "i", codes.tobytes()))
+
+    for name, values in text_columns.items():
+        encoded = [value.encode("utf-8") for value in values]
+        offsets = array("q", [0])
+        for value in encoded:
+            offsets.append(offsets[-1] + len(value))
+        blobs.append((f"{name}.offsets", "q", offsets.tobytes()))
+        blobs.append((f"{name}.text", "B", b"".join(encoded)))
+
+    # Position of each column, relative to the end of the header
+    position = 0
+    for name, typecode, data in blobs:
+        header["columns"][name] = [position, len(data), typecode]
+        position += len(data) + (-len(data) % 8)
+
+    header_json = json.dumps(header).encode("utf-8")
+    header_json += b" " * (-(len(MAGIC) + 8 + len(header_json)) % 8)
+
+    # Write a temporary file first, so readers never see a partial snapshot
+    with open(file_name + ".tmp", "wb") as output_file:
+        output_file.write(MAGIC)
+        output_file.write(struct.pack("<Q", len(header_json)))
+        output_file.write(header_json)
+        for name, typecode, data in blobs:
+            output_file.write(data)
+            output_file.write(b"\0" * (-len(data) % 8))
+    os.replace(file_name + ".tmp", file_name)
+
+
+# Memory-mapped snapshot, use as a context manager:
+#   with Snapshot("prs.snapshot") as snapshot:
+#       snapshot.ints["number"][i], snapshot.coded("author", i), snapshot.text("title", i)
+class Snapshot:
+    def __init__(self, file_name):
+        self.file = open(file_name, "rb")
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.views = []
+
+        header_size = struct.unpack("<Q", self.mmap[len(MAGIC) : len(MAGIC) + 8])[0]
+        header = json.loads(self.mmap[len(MAGIC) + 8 : len(MAGIC) + 8 + header_size])
+        self.count = header["count"]
+        self.tables = header["tables"]
+
+        data_start = len(MAGIC) + 8 + header_size
+        self.ints = dict()
+        for name, (position, size, typecode) in header["columns"].items():
+            view = memoryview(self.mmap)[data_start + position : data_start + position + size].cast(typecode)
+            self.views.append(view)
+            self.ints[name] = view
+
+    # Value of a coded column, e.g. coded("author", 0) => "dluc"
+    def coded(self, name, i):
+        return self.tables[name][self.ints[name][i]]
+
+    # Value of a text column, e.g. text("title", 0)
+    def text(self, name, i):
+        offsets = self.ints[f"{name}.offsets"]
+        return bytes(self.ints[f"{name}.text"][offsets[i] : offsets[i + 1]]).decode("utf-8")
+
+    def close(self):
+        for view in self.views:
+            view.release()
+        self.views = []
+        self.ints = dict()
+        self.mmap.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,115 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+import sqlite3
+
+# Columns with an index, used to filter PRs in the reports
+INDEXED_FIELDS = ["createdAt", "updatedAt", "state", "author", "branch"]
+
+
+# Convert a value to the format used in the CSV file, e.g. True => "True", None => ""
+def to_text(value):
+    if value is None:
+        return ""
+    return str(value)
+
+
+# Open the SQLite database, creating the PRs table and indexes if missing.
+# The table has a column for each field, with the PR number as primary key.
+def open_db(db_file, fields):
+    conn = sqlite3.connect(db_file)
+    columns = ", ".join("number INTEGER PRIMARY KEY" if f == "number" else f"{f} TEXT" for f in fields)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS prs ({columns})")
+    for field in INDEXED_FIELDS:
+        if field in fields:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS prs_{field} ON prs ({field})")
+    return conn
+
+
+# Insert or update PRs, in a single transaction. Returns the number of PRs.
+def db_upsert(db_file, fields, rows):
+    placeholders = ", ".join("?" for f in fields)
+    updates = ", ".join(f"{f} = excluded.{f}" for f in fields if f != "number")
+    sql = f"INSERT INTO prs ({', '.join(fields)}) VALUES ({placeholders}) ON CONFLICT(number) DO UPDATE SET {updates}"
+
+    conn = open_db(db_file, fields)
+    try:
+        with conn:
+            cursor = conn.executemany(
+                sql, ([int(row[f]) if f == "number" else to_text(row[f]) for f in fields] for row in rows)
+            )
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+
+# Read PRs sorted by number, with the same values found in the CSV file.
+# Optional filters:
+# - branch: only PRs targeting the branch
+# - include_drafts: whether to include draft PRs
+# - active_since: only PRs still open, or merged/closed after the date (YYYY-MM-DDTHH:MM:SSZ)
+# - updated_since: only PRs updated after the date (YYYY-MM-DDTHH:MM:SSZ)
+def db_read(db_file, fields, branch=None, include_drafts=True, active_since=None, updated_since=None):
+    where = []
+    params = []
+    if branch is not None:
+        where.append("branch = ?")
+        params.append(branch)
+    if not include_drafts:
+        where.append("UPPER(isDraft) != 'TRUE'")
+    if active_since is not None:
+        where.append("(state = 'OPEN' OR (state = 'MERGED' AND mergedAt >= ?) OR (state = 'CLOSED' AND closedAt >= ?))")
+        params += [active_since, active_since]
+    if updated_since is not None:
+        where.append("updatedAt > ?")
+        params.append(updated_since)
+
+    return db_select(db_file, fields, where, params)
+
+
+# Read the PRs matching some conditions, sorted by number, with the same values found in the CSV file
+def db_select(db_file, fields, where, params):
+    sql = f"SELECT {', '.join(fields)} FROM prs"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY number"
+
+    conn = open_db(db_file, fields)
+    try:
+        for values in conn.execute(sql, params):
+            yield dict(zip(fields, (to_text(v) for v in values)))
+    finally:
+        conn.close()
+
+
+# Fields containing comma separated lists, e.g. "bug,python"
+LIST_FIELDS = ["labels", "assignees"]
+
+
+# Read the PRs matching a query, see query.py, using the table indexes instead of reading all the PRs.
+# - match: list of (field, values) conditions, e.g. [("state", ["OPEN"]), ("labels", ["bug", "docs"])]. PRs
+#   must match all the conditions, a condition matches one of the values. Fields in LIST_FIELDS match if
+#   one of the values is in the list, "" matches PRs with an empty list, e.g. without assignees.
+# - created_since, created_before: creation date range (YYYY-MM-DDTHH:MM:SSZ), end excluded
+def db_query(db_file, fields, match, created_since=None, created_before=None):
+    where = []
+    params = []
+    for field, values in match:
+        if field not in fields:
+            raise ValueError(f"Unknown field '{field}'")
+        conditions = []
+        for value in values:
+            if field in LIST_FIELDS and value:
+                # Exact match of one of the comma separated values, e.g. ",bug," in ",bug,python,"
+                conditions.append(f"instr(',' || {field} || ',', ?) > 0")
+                params.append(f",{value},")
+            else:
+                conditions.append(f"{field} = ?")
+                params.append(value)
+        where.append("(" + " OR ".join(conditions) + ")" if conditions else "0")
+    if created_since is not None:
+        where.append("createdAt >= ?")
+        params.append(created_since)
+    if created_before is not None:
+        where.append("createdAt < ?")
+        params.append(created_before)
+    return db_select(db_file, fields, where, params)
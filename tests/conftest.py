@@ -0,0 +1,34 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+# Tests import the modules in the parent directory. config.py is created by the user,
+# when missing the tests use the default settings in config.py.example.
+
+import importlib.machinery, importlib.util, os, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+if not os.path.isfile(os.path.join(ROOT, "config.py")) and "config" not in sys.modules:
+    loader = importlib.machinery.SourceFileLoader("config", os.path.join(ROOT, "config.py.example"))
+    spec = importlib.util.spec_from_loader("config", loader)
+    config = importlib.util.module_from_spec(spec)
+    loader.exec_module(config)
+    sys.modules["config"] = config
+
+
+import json
+import pytest
+
+
+# Synthetic PRs saved in a temporary directory, in the CSV file, see bench.gen_synthetic_prs().
+# Returns the PRs, as downloaded by `gh pr list`.
+@pytest.fixture
+def synthetic_prs(tmp_path, monkeypatch):
+    import bench, lib
+
+    monkeypatch.chdir(tmp_path)
+    prs = bench.gen_synthetic_prs(1500, seed=1)
+    with open(lib.JSON_FILE, "w") as output_file:
+        json.dump(prs, output_file)
+    lib.update_csv()
+    return prs
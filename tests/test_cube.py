@@ -0,0 +1,71 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+import datetime, json, os
+import pytest
+import lib, cube
+
+
+# Same as datetime, with the current time set by the test, see cube.update_cube()
+class Clock:
+    timezone = datetime.timezone
+
+    def __init__(self, now):
+        self.datetime = type("datetime", (), {"now": staticmethod(lambda tz=None: now)})
+
+
+def update(monkeypatch, prs, now):
+    with open(lib.JSON_FILE, "w") as output_file:
+        json.dump(prs, output_file)
+    lib.update_csv()
+    monkeypatch.setattr(cube, "datetime", Clock(now))
+    cube.update_cube()
+    return cube.read_cube()
+
+
+# A cube created with old versions of the PRs, and updated weeks later with the PRs changed, is
+# the same as a cube created with the new versions of the PRs
+def test_incremental_cube_same_as_fresh(synthetic_prs, tmp_path, monkeypatch):
+    monkeypatch.setattr(lib, "CUBE_FILE", "cube.json")
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    # Old versions: other labels, branch, state, drafts, updated before the new versions
+    changed = [pr for pr in synthetic_prs[::7] if pr["updatedAt"] != pr["createdAt"]]
+    old = {pr["number"]: pr for pr in synthetic_prs}
+    for i, pr in enumerate(changed):
+        old[pr["number"]] = {
+            **pr,
+            "state": "OPEN",
+            "closed": False,
+            "mergedAt": None,
+            "closedAt": None,
+            "isDraft": i % 5 == 0,
+            "baseRefName": "dev" if i % 4 == 0 else lib.MAIN_BRANCH,
+            "labels": [{"name": "old"}] if i % 2 else [],
+            "updatedAt": pr["createdAt"],
+        }
+    os.remove(lib.CSV_FILE)
+    os.remove(lib.WATERMARK_FILE)
+    created = update(monkeypatch, list(old.values()), now - datetime.timedelta(weeks=3))
+
+    incremental = update(monkeypatch, changed, now)
+    assert incremental["through"] > created["through"]
+
+    os.remove(lib.CUBE_FILE)
+    fresh = update(monkeypatch, [], now)
+    assert incremental == fresh
+
+
+def test_cube_stats_same_as_calc_windows_stats(synthetic_prs, monkeypatch):
+    monkeypatch.setattr(lib, "CUBE_FILE", "cube.json")
+    c = update(monkeypatch, [], datetime.datetime.now(datetime.timezone.utc))
+    prs = lib.load_prs(lib.MAIN_BRANCH, False)
+
+    series = cube.weekly_series(c, "branch", lib.MAIN_BRANCH, weeks=20)
+    windows = [(c["through"] - (w + 1) * cube.WEEK, c["through"] - w * cube.WEEK) for w in range(20)][::-1]
+    expected = lib.calc_windows_stats(prs, windows)
+    assert [lib.pr_stats_to_dict(s) for _, s in series] == [lib.pr_stats_to_dict(s) for s in expected]
+
+    # Author categories are read from the main branch cells
+    for category in lib.CATEGORIES:
+        for (_, s), e in zip(cube.weekly_series(c, "category", category, weeks=20), expected):
+            assert s.category_count[category] == e.category_count[category]
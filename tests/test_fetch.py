@@ -0,0 +1,78 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+import lib
+from fetch import node_to_pr
+
+# A PR as downloaded by `gh pr list --json`, see PR_LIST_FIELDS
+GH_PR = {
+    "number": 12,
+    "state": "MERGED",
+    "closed": True,
+    "isDraft": False,
+    "title": "Bump requests",
+    "baseRefName": "main",
+    "createdAt": "2024-01-01T10:00:00Z",
+    "updatedAt": "2024-01-02T10:00:00Z",
+    "mergedAt": "2024-01-02T10:00:00Z",
+    "closedAt": "2024-01-02T10:00:00Z",
+    "author": {"id": "BOT_1", "is_bot": True, "login": "app/dependabot", "name": ""},
+    "assignees": [{"id": "U_1", "login": "dluc", "name": "Devis"}],
+    "labels": [{"id": "L_1", "name": "dependencies", "description": "", "color": "0366d6"}],
+    "url": "https://github.com/owner/repo/pull/12",
+}
+
+# The same PR downloaded via GraphQL, see PR_NODE_FIELDS
+NODE = {
+    "number": 12,
+    "state": "MERGED",
+    "closed": True,
+    "isDraft": False,
+    "title": "Bump requests",
+    "baseRefName": "main",
+    "createdAt": "2024-01-01T10:00:00Z",
+    "updatedAt": "2024-01-02T10:00:00Z",
+    "mergedAt": "2024-01-02T10:00:00Z",
+    "closedAt": "2024-01-02T10:00:00Z",
+    "url": "https://github.com/owner/repo/pull/12",
+    "author": {"__typename": "Bot", "login": "dependabot"},
+    "assignees": {"nodes": [{"login": "dluc"}]},
+    "labels": {"nodes": [{"name": "dependencies"}]},
+}
+
+
+def test_bot_author_same_row():
+    assert lib.pr_to_row(node_to_pr(NODE)) == lib.pr_to_row(GH_PR)
+    assert lib.pr_to_row(node_to_pr(NODE))["author"] == "app/dependabot"
+
+
+def test_user_and_deleted_author():
+    node = {**NODE, "author": {"__typename": "User", "login": "dluc"}}
+    assert lib.pr_to_row(node_to_pr(node))["author"] == "dluc"
+    node = {**NODE, "author": None}
+    assert lib.pr_to_row(node_to_pr(node))["author"] == "ghost"
+
+
+# The same PR received with a webhook, GitHub REST API format, see daemon.py
+REST_PR = {
+    "number": 12,
+    "state": "closed",
+    "draft": False,
+    "title": "Bump requests",
+    "base": {"ref": "main"},
+    "created_at": "2024-01-01T10:00:00Z",
+    "updated_at": "2024-01-02T10:00:00Z",
+    "merged_at": "2024-01-02T10:00:00Z",
+    "closed_at": "2024-01-02T10:00:00Z",
+    "user": {"login": "dependabot[bot]", "type": "Bot"},
+    "assignees": [{"login": "dluc", "type": "User"}],
+    "labels": [{"name": "dependencies"}],
+    "html_url": "https://github.com/owner/repo/pull/12",
+}
+
+
+def test_webhook_bot_author_same_row():
+    from daemon import webhook_to_pr
+
+    assert lib.pr_to_row(webhook_to_pr(REST_PR)) == lib.pr_to_row(GH_PR)
+    user = {**REST_PR, "user": {"login": "dluc", "type": "User"}}
+    assert lib.pr_to_row(webhook_to_pr(user))["author"] == "dluc"
@@ -0,0 +1,50 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+import json
+import pytest
+from lib import iter_json_array
+
+
+def read(tmp_path, text, chunk_size=65536):
+    file_name = tmp_path / "prs.json"
+    file_name.write_text(text)
+    return list(iter_json_array(str(file_name), chunk_size))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 65536])
+@pytest.mark.parametrize(
+    "text",
+    [
+        "[]",
+        " [ ] \n",
+        "[1.25]",
+        "[1, 2.5e3, -4]",
+        '[{"number": 1, "title": "a, b ]"}, {"number": 2}]',
+        '[\n  "x",\n  [1, 2],\n  true,\n  null\n]\n',
+    ],
+)
+def test_same_elements_as_json_load(tmp_path, text, chunk_size):
+    assert read(tmp_path, text, chunk_size) == json.loads(text)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 65536])
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "[1,2",
+        "[1,",
+        '[{"number": 1}',
+        '[{"number": 1',
+        "[1 2]",
+        "[,1]",
+        "[1,,2]",
+        "[1,]",
+        "[1] x",
+        "{}",
+        "[1.]",
+    ],
+)
+def test_invalid_json(tmp_path, text, chunk_size):
+    with pytest.raises(ValueError):
+        read(tmp_path, text, chunk_size)
@@ -0,0 +1,33 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+import json, os, shutil
+import fetch, lib, multi
+
+
+# The summary uses the stats of the report, and the stats saved with it when the report is skipped
+def test_summary_without_reloading_prs(synthetic_prs, monkeypatch):
+    repo = {"name": "owner/repo", "dir": "repo"}
+    os.makedirs(repo["dir"])
+    shutil.copy(lib.JSON_FILE, repo["dir"])
+
+    # process_repo() changes directory and settings, restored after the test
+    monkeypatch.chdir(os.getcwd())
+    monkeypatch.setenv("SYNC_MODE", "async")
+    monkeypatch.setenv("GH_REPO", "")
+    monkeypatch.setattr(fetch, "REPO_DIR", fetch.REPO_DIR)
+    for name in ["MAIN_BRANCH", "TEAM_MEMBERS", "CHARTS_URL", "author_index"]:
+        monkeypatch.setattr(lib, name, getattr(lib, name))
+
+    reports = []
+    gen_report = lib.gen_report
+    monkeypatch.setattr(lib, "gen_report", lambda **kwargs: reports.append(gen_report(**kwargs)) or reports[-1])
+    first = multi.process_repo(repo)
+    assert len(reports) == 1
+    assert first == json.loads(json.dumps(lib.pr_stats_to_dict(reports[0].summary[4])))
+    assert first["int_count"] + first["ext_count"] > 0
+
+    # Second run: the PRs didn't change, the report is skipped and the PRs are not loaded
+    os.chdir("..")
+    monkeypatch.setattr(lib, "load_prs", None)
+    assert multi.process_repo(repo) == first
+    assert len(reports) == 1
@@ -0,0 +1,43 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+import contextlib, datetime, io, multiprocessing, os, threading
+import pytest
+import lib
+
+NOW = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+
+
+def render_report(monkeypatch, workers):
+    monkeypatch.setattr(lib, "REPORT_WORKERS", workers)
+    prs = lib.load_prs(lib.MAIN_BRANCH, False, lib.get_report_since(NOW))
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        lib.print_report(lib.build_report_model("Test", NOW, prs))
+    return output.getvalue()
+
+
+# The report rendered by worker processes is the same rendered by a single process
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="fork not available")
+@pytest.mark.parametrize("charts", ["quickchart", "svg"])
+def test_parallel_report_same_as_serial(synthetic_prs, monkeypatch, charts):
+    if threading.active_count() > 1:
+        pytest.skip("reports are rendered by a single process with other threads running")
+    monkeypatch.setattr(lib, "CHARTS", charts)
+
+    pools = []
+
+    class CountingPool(lib.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            pools.append(args)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(lib, "ProcessPoolExecutor", CountingPool)
+
+    serial = render_report(monkeypatch, 1)
+    assert not pools
+    charts_saved = sorted(os.listdir(lib.CHARTS_DIR)) if charts == "svg" else []
+
+    parallel = render_report(monkeypatch, 4)
+    assert pools
+    assert parallel == serial
+    assert (sorted(os.listdir(lib.CHARTS_DIR)) if charts == "svg" else []) == charts_saved
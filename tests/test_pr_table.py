@@ -0,0 +1,52 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import lib
+
+
+def add_pr(prs, number, state=lib.STATE_OPEN, ended=0):
+    prs.add(number, state, 0, 1000 + number, 2000 + number, ended, "main", "dluc", "", "", "title", "url")
+
+
+# PRs can be added and replaced after the numpy columns are used, e.g. by the daemon
+def test_add_after_columns():
+    prs = lib.PrTable()
+    add_pr(prs, 1)
+    columns = prs.columns()
+    assert columns.created.tolist() == [1001]
+
+    add_pr(prs, 2, lib.STATE_MERGED, 3000)
+    columns = prs.columns()
+    assert columns.created.tolist() == [1001, 1002]
+    assert columns.ended.tolist() == [0, 3000]
+    assert columns.is_open.tolist() == [True, False]
+
+
+def test_replace_after_columns():
+    prs = lib.PrTable()
+    add_pr(prs, 1)
+    add_pr(prs, 2)
+    assert prs.columns().is_open.tolist() == [True, True]
+
+    row = {
+        "number": "2",
+        "state": "MERGED",
+        "isDraft": "False",
+        "createdAt": "2024-01-01T00:00:00Z",
+        "updatedAt": "2024-01-03T00:00:00Z",
+        "mergedAt": "2024-01-03T00:00:00Z",
+        "closedAt": "2024-01-03T00:00:00Z",
+        "branch": "main",
+        "author": "dluc",
+        "assignees": "",
+        "labels": "",
+        "title": "title",
+        "url": "url",
+    }
+    prs.replace(1, row)
+    columns = prs.columns()
+    assert columns.is_open.tolist() == [True, False]
+    assert columns.ended.tolist() == [0, lib.to_epoch("2024-01-03T00:00:00Z")]
@@ -0,0 +1,53 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+import argparse
+import pytest
+import lib, query
+from query import PrIndex, all_of, any_of, equals, created_between
+
+
+def args(**values):
+    defaults = dict(state=[], branch=[], author=[], label=[], assignee=[], unassigned=False, no_drafts=False)
+    return argparse.Namespace(**{**defaults, **values})
+
+
+# Command line options, and the same query using the PR index in memory
+QUERIES = [
+    (args(state=["open"]), equals("state", "OPEN")),
+    (
+        args(state=["open"], branch=["main"], no_drafts=True, label=["bug"]),
+        all_of(equals("state", "OPEN"), equals("branch", "main"), equals("draft", False), equals("label", "bug")),
+    ),
+    (args(label=["bug", ".net"]), any_of(equals("label", "bug"), equals("label", ".net"))),
+    (args(label=["bu"]), equals("label", "bu")),
+    (args(unassigned=True, state=["merged"]), all_of(equals("assignee", ""), equals("state", "MERGED"))),
+    (
+        args(author=["contributor0", "app/github-actions"]),
+        any_of(equals("author", "contributor0"), equals("author", "app/github-actions")),
+    ),
+]
+
+
+def find_numbers(options, since=None, until=None):
+    rows = query.find_rows(query.args_to_match(options), query.to_date(since), query.to_date(until))
+    return [int(row["number"]) for row in rows]
+
+
+# The PRs found reading only the PRs matching, from the CSV file and from SQLite, are the same found with the index
+@pytest.mark.parametrize("storage", ["csv", "sqlite"])
+def test_find_rows_same_as_index(synthetic_prs, monkeypatch, storage):
+    if storage == "sqlite":
+        monkeypatch.setattr(lib, "STORAGE", "sqlite")
+        lib.import_csv_to_db()
+
+    index = PrIndex(lib.load_prs())
+    for options, where in QUERIES:
+        expected = list(index.find(where).number)
+        assert expected or options.label == ["bu"]
+        assert find_numbers(options) == expected
+
+    # Creation date range, begin included, end excluded
+    since, until = synthetic_prs[100]["createdAt"], synthetic_prs[200]["createdAt"]
+    expected = list(index.find(all_of(equals("state", "OPEN"), created_between(since, until))).number)
+    assert find_numbers(args(state=["open"]), since, until) == expected
+    assert find_numbers(args(), "2020-01-01", "2020-01-02") == []
@@ -0,0 +1,51 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+import datetime
+import pytest
+
+import lib
+
+NOW = datetime.datetime.now(datetime.timezone.utc)
+
+COLUMNS = ["number", "state", "is_draft", "is_external", "category", "created", "updated", "ended"]
+COLUMNS += ["branch", "author", "assignees", "labels", "title", "url"]
+
+
+def days_ago(days):
+    return (NOW - datetime.timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+FILTERS = [
+    dict(),
+    dict(branch="main"),
+    dict(branch="missing"),
+    dict(include_drafts=False),
+    dict(active_since=days_ago(30)),
+    dict(updated_since=days_ago(30)),
+    dict(branch="main", include_drafts=False, active_since=days_ago(90)),
+]
+
+
+def table(prs):
+    return {name: list(getattr(prs, name)) for name in COLUMNS}
+
+
+# The snapshot returns the same PRs as the CSV file, with and without numpy
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_snapshot_filters(synthetic_prs, monkeypatch, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(lib, "np", None)
+    monkeypatch.setattr(lib, "SNAPSHOT_FILE", "prs.snapshot")
+    rows = lib.read_csv().values()
+    lib.save_snapshot(lib.read_csv())
+
+    counts = []
+    for filters in FILTERS:
+        expected = table(lib.rows_to_prs(rows, **filters))
+        assert table(lib.load_prs_snapshot(**filters)) == expected, filters
+        counts.append(len(expected["number"]))
+
+    # The filters select different PRs
+    assert len(set(counts)) == len(counts)
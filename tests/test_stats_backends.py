@@ -0,0 +1,28 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import lib
+from test_windows_stats import weekly_windows, to_date
+
+
+def calc_stats(monkeypatch, backend, prs, windows):
+    monkeypatch.setattr(lib, "STATS_BACKEND", backend)
+    ranges = [lib.calc_pr_stats(prs, to_date(w[0]), to_date(w[1])) for w in windows]
+    return [lib.pr_stats_to_dict(s) for s in ranges + lib.calc_windows_stats(prs, windows)]
+
+
+# The numpy backend gives the same stats as the python backend, e.g. averages, histograms, author categories
+def test_numpy_same_as_python(synthetic_prs, monkeypatch):
+    prs = lib.load_prs()
+    windows = weekly_windows()
+    assert calc_stats(monkeypatch, "numpy", prs, windows) == calc_stats(monkeypatch, "python", prs, windows)
+
+
+# Same with the PRs loaded for the report: main branch, no drafts
+def test_numpy_same_as_python_report_prs(synthetic_prs, monkeypatch):
+    windows = weekly_windows()
+    prs = lib.load_prs(lib.MAIN_BRANCH, False, to_date(windows[0][0]))
+    assert calc_stats(monkeypatch, "numpy", prs, windows) == calc_stats(monkeypatch, "python", prs, windows)
@@ -0,0 +1,74 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+import datetime, json
+import lib
+from test_windows_stats import weekly_windows
+
+
+# Calculate the stats of some ranges with the cache, returning the stats and the number of ranges calculated
+def calc_cached(monkeypatch, prs, windows):
+    calculated = []
+    calc_windows_stats = lib.calc_windows_stats
+    monkeypatch.setattr(lib, "calc_windows_stats", lambda p, w: calculated.extend(w) or calc_windows_stats(p, w))
+    results = [lib.pr_stats_to_dict(s) for s in lib.calc_windows_stats_cached(prs, windows)]
+    monkeypatch.setattr(lib, "calc_windows_stats", calc_windows_stats)
+    return results, len(calculated)
+
+
+def fresh(prs, windows):
+    return [lib.pr_stats_to_dict(s) for s in lib.calc_windows_stats(prs, windows)]
+
+
+def test_cache_reused(synthetic_prs, monkeypatch):
+    monkeypatch.setattr(lib, "STATS_CACHE_FILE", "stats-cache.json")
+    prs = lib.load_prs()
+    windows = weekly_windows()[:-1]
+
+    results, calculated = calc_cached(monkeypatch, prs, windows)
+    assert calculated == len(windows) and results == fresh(prs, windows)
+    results, calculated = calc_cached(monkeypatch, prs, windows)
+    assert calculated == 0 and results == fresh(prs, windows)
+
+
+# A PR changed after the stats were saved discards the ranges it overlaps, and only those
+def test_cache_discarded_when_pr_changes(synthetic_prs, monkeypatch):
+    monkeypatch.setattr(lib, "STATS_CACHE_FILE", "stats-cache.json")
+    windows = weekly_windows()[:-1]
+    calc_cached(monkeypatch, lib.load_prs(), windows)
+
+    # Reopen a PR created after the first range, merged in the third range
+    pr = next(
+        pr
+        for pr in synthetic_prs
+        if pr["state"] == "MERGED"
+        and pr["baseRefName"] == lib.MAIN_BRANCH
+        and windows[0][1] < lib.to_epoch(pr["createdAt"])
+        and windows[2][0] < lib.to_epoch(pr["mergedAt"]) < windows[2][1]
+    )
+    # Updated after the most recent PR, which sets the watermark of the stats saved
+    updated = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=1)
+    pr = {**pr, "state": "OPEN", "closed": False, "mergedAt": None, "closedAt": None}
+    pr["updatedAt"] = updated.strftime("%Y-%m-%dT%H:%M:%SZ")
+    with open(lib.JSON_FILE, "w") as output_file:
+        json.dump([pr], output_file)
+    lib.update_csv()
+
+    prs = lib.load_prs()
+    overlapping = [w for w in windows if w[1] >= lib.to_epoch(pr["createdAt"])]
+    results, calculated = calc_cached(monkeypatch, prs, windows)
+    assert 0 < calculated == len(overlapping) < len(windows)
+    assert results == fresh(prs, windows)
+
+
+# Settings affecting the stats discard all the ranges, e.g. a new team member
+def test_cache_discarded_when_config_changes(synthetic_prs, monkeypatch):
+    monkeypatch.setattr(lib, "STATS_CACHE_FILE", "stats-cache.json")
+    windows = weekly_windows()[:-1]
+    calc_cached(monkeypatch, lib.load_prs(), windows)
+
+    monkeypatch.setattr(lib, "TEAM_MEMBERS", lib.TEAM_MEMBERS + ["contributor0"])
+    monkeypatch.setattr(lib, "author_index", None)
+    prs = lib.load_prs()
+    results, calculated = calc_cached(monkeypatch, prs, windows)
+    assert calculated == len(windows)
+    assert results == fresh(prs, windows)
@@ -0,0 +1,31 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+import datetime
+import lib
+
+NOW = datetime.datetime(2026, 10, 18, 12, 0, 0, tzinfo=datetime.timezone.utc)
+
+
+def labels(monkeypatch, granularity, history_days):
+    monkeypatch.setattr(lib, "WINDOW_GRANULARITY", granularity)
+    monkeypatch.setattr(lib, "HISTORY_DAYS", history_days)
+    keys, _ = lib.get_chart_windows(NOW)
+    return [lib.window_label(key) for key in keys]
+
+
+# Rolling ranges are labeled with their last day, e.g. the 7 days ending today
+def test_rolling_labels(monkeypatch):
+    assert labels(monkeypatch, "rolling", 14) == ["2026-10-18", "2026-10-11"]
+
+
+# Aligned ranges are labeled with their first day, so the current day doesn't repeat the previous one
+def test_aligned_labels(monkeypatch):
+    assert labels(monkeypatch, "day", 2) == ["2026-10-18", "2026-10-17", "2026-10-16"]
+    assert labels(monkeypatch, "week", 7) == ["2026-10-12", "2026-10-05"]
+    assert labels(monkeypatch, "month", 31) == ["2026-10-01", "2026-09-01"]
+
+
+def test_history_label(monkeypatch):
+    for days, label in [(120, "last 4 months"), (30, "last 1 month"), (14, "last 2 weeks"), (10, "last 10 days")]:
+        monkeypatch.setattr(lib, "HISTORY_DAYS", days)
+        assert lib.history_label() == label
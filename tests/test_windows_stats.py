@@ -0,0 +1,23 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+import datetime
+import lib
+
+
+# Weekly ranges of the last 20 weeks, as (begin, end) epoch seconds, in ascending order
+def weekly_windows():
+    now = int(datetime.datetime.now(datetime.timezone.utc).timestamp())
+    return [(now - (w + 1) * 7 * 86400, now - w * 7 * 86400) for w in range(20)][::-1]
+
+
+def to_date(t):
+    return datetime.datetime.fromtimestamp(t, datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+# One pass over the PRs for all the ranges gives the same stats as calc_pr_stats() for each range
+def test_windows_stats_same_as_each_range(synthetic_prs):
+    prs = lib.load_prs()
+    windows = weekly_windows()
+    for w, result in zip(windows, lib.calc_windows_stats(prs, windows)):
+        expected = lib.calc_pr_stats(prs, to_date(w[0]), to_date(w[1]))
+        assert lib.pr_stats_to_dict(result) == lib.pr_stats_to_dict(expected)
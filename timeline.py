@@ -0,0 +1,255 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+# PR lifecycle: timeline events (ready for review, reviews, review requests, assignments, labels),
+# and the time each PR spends in each state, see TIMELINE_FILE in config.py.
+#
+# Timelines are downloaded only for the PRs changed since the last download (the PRs in JSON_FILE),
+# and saved in TIMELINE_FILE, one PR per line, with the PR events and the intervals of time
+# spent in each state, calculated when the timeline is downloaded:
+# - draft:    PR in draft
+# - review:   waiting for reviewers, e.g. after the PR is ready for review or a review is requested
+# - author:   waiting for the author, after a review requesting changes or with comments
+# - approved: approved, waiting to be merged
+# The report stats use only the intervals, without processing the events again.
+
+import lib, fetch
+from lib import to_epoch
+import bisect, json, os, statistics, subprocess, sys
+
+DRAFT = "draft"
+REVIEW = "review"
+AUTHOR = "author"
+APPROVED = "approved"
+STATES = [DRAFT, REVIEW, AUTHOR, APPROVED]
+
+# PRs per GraphQL request
+BATCH_SIZE = 25
+
+# Timeline events downloaded for each PR, only the first 100
+TIMELINE_FIELDS = """
+    timelineItems(first: 100, itemTypes: [READY_FOR_REVIEW_EVENT, CONVERT_TO_DRAFT_EVENT, PULL_REQUEST_REVIEW,
+                                          REVIEW_REQUESTED_EVENT, ASSIGNED_EVENT, LABELED_EVENT]) {
+      nodes {
+        __typename
+        ... on ReadyForReviewEvent { createdAt actor { login } }
+        ... on ConvertToDraftEvent { createdAt actor { login } }
+        ... on PullRequestReview { submittedAt state author { login } }
+        ... on ReviewRequestedEvent { createdAt actor { login } }
+        ... on AssignedEvent { createdAt actor { login } }
+        ... on LabeledEvent { createdAt actor { login } label { name } }
+      }
+    }
+"""
+
+# Event types saved in TIMELINE_FILE
+EVENT_TYPES = {
+    "ReadyForReviewEvent": "ready",
+    "ConvertToDraftEvent": "draft",
+    "PullRequestReview": "review",
+    "ReviewRequestedEvent": "review_requested",
+    "AssignedEvent": "assigned",
+    "LabeledEvent": "labeled",
+}
+
+
+# Download the timeline of some PRs, with a single GraphQL request. Returns the events of each PR.
+def fetch_timelines(numbers):
+    items = "".join(f"    pr{n}: pullRequest(number: {n}) {{{TIMELINE_FIELDS}    }}\n" for n in numbers)
+    query = "query($owner: String!, $repo: String!) {\n  repository(owner: $owner, name: $repo) {\n" + items + "  }\n}"
+    cmd = [fetch.GH_CLI, "api", "graphql", "-F", "owner={owner}", "-F", "repo={repo}", "-f", f"query={query}"]
+    output = subprocess.run(cmd, cwd=fetch.REPO_DIR, check=True, capture_output=True, text=True).stdout
+    repository = json.loads(output)["data"]["repository"]
+
+    timelines = dict()
+    for n in numbers:
+        events = []
+        for node in (repository.get(f"pr{n}") or {"timelineItems": {"nodes": []}})["timelineItems"]["nodes"]:
+            at = node.get("createdAt") or node.get("submittedAt")
+            # Pending reviews are not submitted yet
+            if node["__typename"] not in EVENT_TYPES or not at:
+                continue
+            actor = node.get("actor") or node.get("author") or {"login": "ghost"}
+            event = {"type": EVENT_TYPES[node["__typename"]], "at": at, "actor": actor["login"]}
+            if "state" in node:
+                event["state"] = node["state"]
+            if "label" in node:
+                event["label"] = node["label"]["name"]
+            events.append(event)
+        timelines[n] = sorted(events, key=lambda e: e["at"])
+    return timelines
+
+
+# Calculate the intervals of time spent in each state, as [state, begin, end] (epoch seconds,
+# end is None if the PR is still open), the date the PR was ready for review, and the date
+# of the first review after that (None if not happened yet)
+def calc_intervals(record):
+    events = record["events"]
+    author = record["author"]
+
+    # The first draft/ready event shows if the PR was created as draft
+    transitions = [e["type"] for e in events if e["type"] in ["ready", "draft"]]
+    if transitions:
+        state = DRAFT if transitions[0] == "ready" else REVIEW
+    else:
+        state = DRAFT if record["is_draft"] else REVIEW
+
+    begin = record["created"]
+    ready_at = begin if state == REVIEW else None
+    first_review_at = None
+    intervals = []
+    for event in events:
+        at = to_epoch(event["at"])
+        is_review = event["type"] == "review" and event["actor"] != author
+
+        if is_review and ready_at is not None and first_review_at is None:
+            first_review_at = at
+
+        if event["type"] == "draft":
+            new_state = DRAFT
+        elif event["type"] == "ready":
+            new_state = REVIEW
+            if ready_at is None:
+                ready_at = at
+        elif state == DRAFT:
+            # Reviews and review requests don't change the state of draft PRs
+            continue
+        elif is_review:
+            new_state = APPROVED if event.get("state") == "APPROVED" else AUTHOR
+        elif event["type"] == "review_requested":
+            new_state = REVIEW
+        else:
+            continue
+
+        if new_state != state:
+            intervals.append([state, begin, at])
+            state, begin = new_state, at
+
+    intervals.append([state, begin, record["ended"] or None])
+    record["intervals"] = intervals
+    record["ready_at"] = ready_at
+    record["first_review_at"] = first_review_at
+    return record
+
+
+# Read the timelines saved in TIMELINE_FILE, by PR number
+def read_timelines():
+    records = dict()
+    if os.path.isfile(lib.TIMELINE_FILE):
+        with open(lib.TIMELINE_FILE, "r") as input_file:
+            for line in input_file:
+                if line.strip():
+                    record = json.loads(line)
+                    records[record["number"]] = record
+    return records
+
+
+# Download the timelines of the PRs in JSON_FILE changed since their timeline was downloaded,
+# and save them in TIMELINE_FILE. Returns the number of timelines downloaded.
+def update_timelines():
+    if not lib.TIMELINE_FILE:
+        return 0
+
+    records = read_timelines()
+    changed = dict()
+    for pr in lib.iter_json_array(lib.JSON_FILE):
+        row = lib.pr_to_row(pr)
+        number = int(row["number"])
+        if number in records and records[number]["updated"] == row["updatedAt"]:
+            continue
+        ended = {"MERGED": row["mergedAt"], "CLOSED": row["closedAt"]}.get(row["state"])
+        changed[number] = {
+            "number": number,
+            "updated": row["updatedAt"],
+            "author": row["author"],
+            "created": to_epoch(row["createdAt"]),
+            "ended": to_epoch(ended) if ended else 0,
+            "is_draft": lib.to_bool(row["isDraft"]),
+        }
+
+    numbers = sorted(changed.keys())
+    for i in range(0, len(numbers), BATCH_SIZE):
+        for number, events in fetch_timelines(numbers[i : i + BATCH_SIZE]).items():
+            changed[number]["events"] = events
+            records[number] = calc_intervals(changed[number])
+
+    if numbers:
+        with open(lib.TIMELINE_FILE + ".tmp", "w") as output_file:
+            for number in sorted(records.keys()):
+                output_file.write(json.dumps(records[number]) + "\n")
+        os.replace(lib.TIMELINE_FILE + ".tmp", lib.TIMELINE_FILE)
+
+    return len(numbers)
+
+
+# Index of the PR lifecycle intervals, to calculate stats for date ranges without processing the events
+class TimelineIndex:
+    def __init__(self, records):
+        # Time to first review, sorted by the date the PR was ready for review
+        waits = sorted(
+            (r["ready_at"], r["first_review_at"] - r["ready_at"]) for r in records if r["first_review_at"] is not None
+        )
+        self.ready_at = [w[0] for w in waits]
+        self.waits = [w[1] for w in waits]
+
+        # Intervals of time in each state, open intervals end at sys.maxsize
+        self.intervals = [(b, e or sys.maxsize, s) for r in records for s, b, e in r["intervals"]]
+
+    # Time to first review (seconds) of the PRs ready for review in the date range
+    def first_review_waits(self, begin, end):
+        return self.waits[bisect.bisect_left(self.ready_at, begin) : bisect.bisect_left(self.ready_at, end)]
+
+    # Seconds spent in each state, within each date range, counting time only until `now`.
+    # Ranges are (begin, end) tuples, in ascending order, same as calc_windows_stats().
+    def time_in_state(self, windows, now):
+        begins = [w[0] for w in windows]
+        ends = [w[1] for w in windows]
+        results = [{state: 0 for state in STATES} for w in windows]
+        for begin, end, state in self.intervals:
+            end = min(end, now)
+            # Ranges ending after the interval begins, and starting before it ends
+            for w in range(bisect.bisect_right(ends, begin), bisect.bisect_left(begins, end)):
+                overlap = min(end, ends[w]) - max(begin, begins[w])
+                if overlap > 0:
+                    results[w][state] += overlap
+        return results
+
+
+# Lifecycle stats for each chart date range (keys returned by get_chart_windows), using the PRs in the report
+def calc_timeline_stats(prs, keys, now):
+    numbers = set(prs.number)
+    index = TimelineIndex([r for n, r in read_timelines().items() if n in numbers])
+
+    keys = keys[::-1]
+    windows = [(to_epoch(key.split("|")[0]), to_epoch(key.split("|")[1])) for key in keys]
+    times = index.time_in_state(windows, int(now.timestamp()))
+
+    result = []
+    for key, w, time_in_state in zip(keys, windows, times):
+        waits = index.first_review_waits(w[0], w[1])
+        total = sum(time_in_state.values())
+        result.insert(
+            0,
+            {
+                "begin": key.split("|")[0],
+                "end": key.split("|")[1],
+                "reviewed": len(waits),
+                "median_hours_to_first_review": statistics.median(waits) / 3600 if waits else 0,
+                "time_in_state": {s: time_in_state[s] / total * 100 if total else 0 for s in STATES},
+            },
+        )
+    return result
+
+
+# Print the lifecycle stats calculated by calc_timeline_stats()
+def print_timeline_stats(stats):
+    print(f"## Time to first review and time in state, {lib.history_label()}\n")
+    print("Hours from ready for review to first review, and % of time PRs spent in each state.\n")
+    print("Date | Reviewed | Median hours to first review | % draft | % waiting review | % waiting author | % approved")
+    print("---- | -------- | ---------------------------- | ------- | ---------------- | ---------------- | ----------")
+    for s in stats:
+        t = s["time_in_state"]
+        print(
+            f"{lib.window_label(s['begin'] + '|' + s['end'])} | {s['reviewed']} | {s['median_hours_to_first_review']:.1f}"
+            + f" | {t[DRAFT]:.1f} | {t[REVIEW]:.1f} | {t[AUTHOR]:.1f} | {t[APPROVED]:.1f}"
+        )
+    print("")
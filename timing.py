@@ -0,0 +1,115 @@
+# Author: Devis Lucato, https://github.com/dluc
+
+# Instrumentation: wall time, rows and memory of the pipeline functions. The peak memory (ru_maxrss) is
+# the peak of the whole process so far: each call records how much the peak grew during the call, i.e.
+# the memory the call needed beyond the previous peak, 0 if it needed less than an earlier call.
+# Each run appends a JSON line to RUN_LOG_FILE, with the stats of every call. The file is rotated
+# when larger than RUN_LOG_MAX_MB, keeping the previous lines in RUN_LOG_FILE + ".1".
+# Set PROFILE=1 in the environment to save a cProfile dump, e.g. gen_report.prof
+
+import config
+import cProfile, datetime, functools, json, os, resource, sys, time
+
+# Optional settings, using defaults if missing in config.py
+RUN_LOG_FILE = getattr(config, "RUN_LOG_FILE", "run-log.jsonl")
+RUN_LOG_MAX_MB = getattr(config, "RUN_LOG_MAX_MB", 10)
+
+# Calls recorded in the current run
+calls = []
+depth = 0
+
+
+# Peak memory used by the process so far, in MB. ru_maxrss is in KB on Linux, in bytes on macOS.
+def peak_memory_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# Number of rows processed by a call: size of the PR table passed as first
+# argument, or size of the result, e.g. the PRs read from the CSV file
+def count_rows(args, result):
+    if args and hasattr(args[0], "__len__") and not isinstance(args[0], str):
+        return len(args[0])
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    if hasattr(result, "__len__") and not isinstance(result, str):
+        return len(result)
+    return None
+
+
+# Save the calls of the current run in RUN_LOG_FILE
+def write_run_record(name, secs):
+    record = {
+        "time": datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "run": name,
+        "secs": round(secs, 4),
+        "peak_mb": round(peak_memory_mb(), 1),
+        "calls": calls,
+    }
+    # Rotate the file, so it doesn't grow without limits, e.g. with run.sh in crontab
+    if os.path.isfile(RUN_LOG_FILE) and os.path.getsize(RUN_LOG_FILE) > RUN_LOG_MAX_MB * 1024 * 1024:
+        os.replace(RUN_LOG_FILE, RUN_LOG_FILE + ".1")
+
+    with open(RUN_LOG_FILE, "a") as output_file:
+        output_file.write(json.dumps(record) + "\n")
+
+
+# Record wall time, rows and peak memory of each call of the decorated function.
+# The outermost call, e.g. gen_report(), writes the run record.
+def timed(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global calls, depth
+
+        outermost = depth == 0
+        profiler = None
+        if outermost:
+            calls = []
+            if os.environ.get("PROFILE"):
+                profiler = cProfile.Profile()
+                profiler.enable()
+
+        record = {"name": func.__name__, "depth": depth}
+        calls.append(record)
+        depth += 1
+        peak = peak_memory_mb()
+        begin = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            secs = time.perf_counter() - begin
+            depth -= 1
+
+        record["secs"] = round(secs, 4)
+        record["rows"] = count_rows(args, result)
+        record["peak_growth_mb"] = round(peak_memory_mb() - peak, 1)
+
+        if outermost:
+            if profiler:
+                profiler.disable()
+                profiler.dump_stats(f"{func.__name__}.prof")
+            write_run_record(func.__name__, secs)
+
+        return result
+
+    return wrapper
+
+
+# Print a table with the time spent in each function in the current run, e.g. at the end of the report
+def print_timings():
+    totals = dict()
+    for record in calls:
+        if "secs" not in record:
+            continue
+        total = totals.setdefault(record["name"], {"calls": 0, "secs": 0, "rows": 0, "peak_growth_mb": 0})
+        total["calls"] += 1
+        total["secs"] += record["secs"]
+        total["rows"] = max(total["rows"], record["rows"] or 0)
+        total["peak_growth_mb"] += record["peak_growth_mb"]
+
+    print("## Timings\n")
+    print("Function | Calls | Secs | Rows | Peak growth MB")
+    print("-------- | ----- | ---- | ---- | --------------")
+    for name, total in totals.items():
+        rows = total["rows"] or ""
+        print(f"{name} | {total['calls']} | {total['secs']:.3f} | {rows} | {total['peak_growth_mb']:.1f}")